@@ -7,6 +7,8 @@ import pandas as pd
 import json
 from datetime import datetime
 
+from pipeline_manifest import fingerprint, is_fresh, record_stage, skip_notice
+
 def generate_pine_script(csv_path='saudiexchange_rs_analysis.csv', 
                          output_path='saudi_rs_auto_generated.pine'):
     """
@@ -156,4 +158,9 @@ if (not isDaily and barstate.islast)
     print("[pine-gen] ✅ Done!")
 
 if __name__ == "__main__":
-    generate_pine_script()
+    inputs = fingerprint(['saudiexchange_rs_analysis.csv'])
+    if is_fresh('generate_pine_script', inputs):
+        skip_notice('generate_pine_script')
+    else:
+        generate_pine_script()
+        record_stage('generate_pine_script', inputs, ['saudi_rs_auto_generated.pine', 'saudi_rs_auto_metadata.json'])
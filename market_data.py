@@ -0,0 +1,91 @@
+"""
+Typed, columnar view of the scraped market performance data.
+
+The scraper keeps the page's text verbatim in saudiexchange_results.json/.csv
+("1,100,500,507", "143.83"). This module parses the numeric columns once,
+vectorized, and stores the result as Parquet so later stages can load typed
+arrays directly instead of cleaning strings row by row.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (pandas' Parquet engine)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+TEXT_COLUMNS = ["period", "Company", "Symbol"]
+NUMERIC_COLUMNS = ["Open", "Highest", "Lowest", "Close", "Change", "Change %", "Volume Traded", "Value Traded"]
+INTEGER_COLUMNS = ["Volume Traded"]
+RESULTS_PARQUET = "saudiexchange_results.parquet"
+
+
+def parse_numeric_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert the numeric text columns in place: strip thousands separators and '%'."""
+    for col in NUMERIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        cleaned = (
+            df[col].astype("string")
+            .str.replace(",", "", regex=False)
+            .str.replace("%", "", regex=False)
+            .str.strip()
+        )
+        values = pd.to_numeric(cleaned, errors="coerce")
+        df[col] = values.round().astype("Int64") if col in INTEGER_COLUMNS else values.astype("float64")
+    return df
+
+
+def to_typed_frame(results: Dict[str, List[Dict[str, str]]]) -> pd.DataFrame:
+    """Flatten ``{period: rows}`` into one typed DataFrame (one row per company per period)."""
+    frames = []
+    for period, rows in results.items():
+        if not rows:
+            continue
+        f = pd.DataFrame.from_records(rows)
+        f.insert(0, "period", period)
+        frames.append(f)
+    if not frames:
+        return pd.DataFrame(columns=TEXT_COLUMNS + NUMERIC_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].fillna("").astype(str) if col in df.columns else ""
+    return parse_numeric_columns(df)
+
+
+def stale_periods(df: pd.DataFrame) -> Dict[str, str]:
+    """``{period: scraped_at}`` for periods the scraper filled from its cache (rows marked ``Stale``)."""
+    if "Stale" not in df.columns:
+        return {}
+    marked = df[df["Stale"].fillna("").astype(str) != ""]
+    return marked.groupby("period")["Stale"].first().to_dict()
+
+
+def save_columnar(df: pd.DataFrame, path: str = RESULTS_PARQUET) -> bool:
+    """Write ``df`` as Parquet. Returns False (and leaves no file) when pyarrow is missing."""
+    if not PYARROW_AVAILABLE:
+        print("[warn] pyarrow not available, skipping columnar output")
+        return False
+    df.to_parquet(path, index=False)
+    print(f"[save] wrote typed columnar results to {path}")
+    return True
+
+
+def load_typed_results(csv_path: str = "saudiexchange_results.csv",
+                       parquet_path: Optional[str] = RESULTS_PARQUET) -> pd.DataFrame:
+    """Load the scrape as a typed frame.
+
+    Prefers the Parquet file when it is at least as new as the CSV, and
+    otherwise parses the CSV with the same vectorized conversion.
+    """
+    if parquet_path and PYARROW_AVAILABLE and os.path.exists(parquet_path):
+        if not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path):
+            print(f"[init] reading typed data from {parquet_path}")
+            return pd.read_parquet(parquet_path)
+    print(f"[init] reading data from {csv_path}")
+    df = pd.read_csv(csv_path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    return parse_numeric_columns(df)
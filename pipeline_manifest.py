@@ -0,0 +1,113 @@
+"""
+Content fingerprints for the daily pipeline stages.
+
+Each stage (save_categories, scraper, recalculate_rs, generate_pine_script)
+records the SHA-256 of its inputs and outputs in pipeline_manifest.json.
+A stage whose inputs hash the same as last time, and whose recorded outputs
+are still on disk untouched, can skip its work entirely.
+
+Because a stage's input digests are the previous stage's output digests,
+the manifest is also a provenance record: it shows which scrape produced
+which RS analysis and which Pine script. Run this module to print the chain.
+
+Set PIPELINE_FORCE=1 to ignore the manifest and run every stage.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+MANIFEST_PATH = "pipeline_manifest.json"
+PIPELINE_ORDER = ["save_categories", "scraper", "recalculate_rs", "generate_pine_script"]
+
+
+def digest_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def digest_file(path: str) -> Optional[str]:
+    """SHA-256 of a file's content, or None when it does not exist."""
+    if not os.path.exists(path):
+        return None
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def digest_json(obj) -> str:
+    """Digest of a JSON-serializable object, independent of key order."""
+    return digest_bytes(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+
+
+def fingerprint(paths: Iterable[str]) -> Dict[str, Optional[str]]:
+    return {p: digest_file(p) for p in paths}
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict) and isinstance(manifest.get("stages"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"stages": {}}
+
+
+def is_fresh(stage: str, inputs: Dict[str, Optional[str]], path: str = MANIFEST_PATH) -> bool:
+    """True when ``stage`` last ran on identical inputs and its outputs are unchanged."""
+    if os.environ.get("PIPELINE_FORCE", "").strip() in ("1", "true", "yes"):
+        return False
+    entry = load_manifest(path)["stages"].get(stage)
+    if not entry or entry.get("inputs") != inputs:
+        return False
+    outputs = entry.get("outputs") or {}
+    return all(digest_file(p) == d for p, d in outputs.items())
+
+
+def record_stage(stage: str, inputs: Dict[str, Optional[str]], outputs: Iterable[str],
+                 path: str = MANIFEST_PATH, **meta) -> Dict:
+    """Store the input digests and the current output digests for ``stage``."""
+    manifest = load_manifest(path)
+    entry = {
+        "inputs": inputs,
+        "outputs": fingerprint(outputs),
+        "completed_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    entry.update(meta)
+    manifest["stages"][stage] = entry
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+    return entry
+
+
+def skip_notice(stage: str) -> None:
+    print(f"[manifest] {stage}: inputs unchanged since last run, skipping (PIPELINE_FORCE=1 to override)")
+
+
+def provenance(path: str = MANIFEST_PATH) -> None:
+    """Print each stage and whether its inputs match an upstream stage's recorded outputs."""
+    stages = load_manifest(path)["stages"]
+    produced = {(p, d): name for name, entry in stages.items() for p, d in entry.get("outputs", {}).items()}
+    for name in PIPELINE_ORDER:
+        entry = stages.get(name)
+        if not entry:
+            print(f"{name}: not recorded")
+            continue
+        print(f"{name}: completed {entry.get('completed_at')}")
+        for p, d in entry.get("inputs", {}).items():
+            src = produced.get((p, d))
+            origin = f"from {src}" if src else "external"
+            print(f"  in  {p}: {(d or 'missing')[:12]} ({origin})")
+        for p, d in entry.get("outputs", {}).items():
+            print(f"  out {p}: {(d or 'missing')[:12]}")
+
+
+if __name__ == "__main__":
+    provenance()
@@ -0,0 +1,171 @@
+"""
+Streaming loader for the prices table.
+
+Instead of pulling the whole result set into client memory (``fetchall``,
+``read_sql``, ``Query.all()``) and then building a DataFrame from it, rows
+are fetched in fixed-size batches from a server-side cursor and written
+straight into preallocated NumPy column buffers. Peak memory is the column
+buffers plus one batch, however long the history gets.
+
+Text columns are interned (one Python string per distinct value) and dates
+are stored as datetime64[D] until the DataFrame is built, so the returned
+frame has the same object columns as ``read_sql`` without one object per row:
+
+    from price_loader import stream_prices
+    prices, stats = stream_prices(conn, where="date >= %s", params=[start])
+    print(stats["rows_per_sec"], stats["peak_bytes"])
+"""
+
+import time
+import tracemalloc
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+FETCH_SIZE = 20000
+
+# column name -> kind ("text", "date" or "float")
+PRICE_COLUMNS = {
+    "symbol": "text",
+    "date": "date",
+    "close": "float",
+    "company_name": "text",
+    "industry_group": "text",
+}
+
+_BUFFER_DTYPES = {"text": np.int32, "date": "datetime64[D]", "float": np.float64}
+
+# server-side casts: Decimal and datetime.date are slow to convert per row,
+# float8 and day numbers (days since 1970-01-01) copy into the buffers directly
+_SELECT_EXPR = {
+    "text": "{0}",
+    "date": "({0} - DATE '1970-01-01') AS {0}",
+    "float": "{0}::float8 AS {0}",
+}
+
+
+def fill_buffers(batches: Iterable[Sequence[tuple]], columns: Dict[str, str],
+                 n_rows: int = 0, trace_memory: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """Copy row batches into per-column NumPy buffers and build a DataFrame.
+
+    ``n_rows`` sizes the buffers up front; if more rows arrive they grow by
+    doubling. Date values may be ``datetime.date`` or days since 1970-01-01.
+    Returns the frame and the load stats (rows, seconds, rows_per_sec,
+    buffer_bytes, peak_bytes). ``peak_bytes`` is the tracemalloc peak over
+    the whole load, batches included; tracemalloc is started for the load
+    (and stopped again) if it is not already tracing. Tracing makes the load
+    about 3x slower; with ``trace_memory=False`` it is skipped and
+    ``peak_bytes`` is None unless tracemalloc was already on.
+    """
+    started = trace_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        return _fill_buffers(batches, columns, n_rows)
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _fill_buffers(batches, columns, n_rows):
+    t0 = time.perf_counter()
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    names = list(columns)
+    capacity = max(int(n_rows), 1)
+    buffers = {name: np.empty(capacity, dtype=_BUFFER_DTYPES[kind]) for name, kind in columns.items()}
+    vocab: Dict[str, Dict] = {name: {} for name, kind in columns.items() if kind == "text"}
+
+    filled = 0
+    for batch in batches:
+        n = len(batch)
+        if not n:
+            continue
+        if filled + n > capacity:
+            capacity = max(capacity * 2, filled + n)
+            for name in names:
+                buffers[name] = np.resize(buffers[name], capacity)
+        values = list(zip(*batch))
+        for i, name in enumerate(names):
+            kind = columns[name]
+            col = values[i]
+            if kind == "text":
+                lookup = vocab[name]
+                codes = [lookup.setdefault(v, len(lookup)) for v in col]
+                buffers[name][filled:filled + n] = codes
+            elif kind == "date":
+                buffers[name][filled:filled + n] = np.array(col, dtype="datetime64[D]")
+            else:
+                buffers[name][filled:filled + n] = np.array(col, dtype=np.float64)
+        filled += n
+
+    buffer_bytes = sum(buf[:filled].nbytes for buf in buffers.values())
+    data = {}
+    for name, kind in columns.items():
+        buf = buffers[name][:filled]
+        if kind == "text":
+            data[name] = np.array(list(vocab[name]), dtype=object)[buf] if filled else np.array([], dtype=object)
+        elif kind == "date":
+            # one datetime.date object per distinct day, shared by every row on that day
+            uniq, inverse = np.unique(buf, return_inverse=True)
+            data[name] = uniq.astype(object)[inverse]
+        else:
+            data[name] = buf
+    df = pd.DataFrame(data, columns=names)
+
+    seconds = time.perf_counter() - t0
+    stats = {
+        "rows": filled,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(filled / seconds) if seconds > 0 else None,
+        "buffer_bytes": buffer_bytes,
+        "peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+    }
+    peak = f", peak {stats['peak_bytes'] / 1e6:.1f} MB" if stats["peak_bytes"] is not None else ""
+    print(f"[loader] {filled:,} rows in {seconds:.2f}s ({stats['rows_per_sec'] or 0:,} rows/s), "
+          f"buffers {buffer_bytes / 1e6:.1f} MB{peak}")
+    return df, stats
+
+
+def _cursor_batches(cur, fetch_size: int):
+    while True:
+        rows = cur.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def stream_prices(conn, where: str = "", params: Optional[List] = None,
+                  columns: Dict[str, str] = PRICE_COLUMNS, table: str = "prices",
+                  order_by: str = "symbol, date", fetch_size: int = FETCH_SIZE,
+                  trace_memory: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """Load ``columns`` from ``table`` through a psycopg2 named (server-side) cursor.
+
+    ``where`` is an SQL condition without the WHERE keyword, with ``%s``
+    placeholders bound from ``params``. The row count is queried first so the
+    buffers are allocated once.
+    """
+    clause = f"WHERE {where}" if where else ""
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {table} {clause}", params)
+        n_rows = cur.fetchone()[0]
+    select = ", ".join(_SELECT_EXPR[kind].format(name) for name, kind in columns.items())
+    query = f"SELECT {select} FROM {table} {clause} ORDER BY {order_by}"
+    with conn.cursor(name=f"{table}_stream") as cur:
+        cur.itersize = fetch_size
+        cur.execute(query, params)
+        return fill_buffers(_cursor_batches(cur, fetch_size), columns, n_rows, trace_memory)
+
+
+def stream_query(query, columns: Dict[str, str], fetch_size: int = FETCH_SIZE,
+                 trace_memory: bool = True) -> Tuple[pd.DataFrame, Dict]:
+    """Same as ``stream_prices`` for a SQLAlchemy ``Query`` (uses ``yield_per``).
+
+    The query must select exactly ``columns``, in the same order.
+    """
+    n_rows = query.order_by(None).count()
+    rows = iter(query.yield_per(fetch_size))
+    batches = iter(lambda: list(islice(rows, fetch_size)), [])
+    return fill_buffers(batches, columns, n_rows, trace_memory)
@@ -4,33 +4,21 @@ import sys
 import pandas as pd
 import numpy as np
 
+import results_store
+from market_data import RESULTS_PARQUET, load_typed_results, stale_periods
+from pipeline_manifest import fingerprint, is_fresh, record_stage, skip_notice
+from rs_ranking import percentile_rating
+
 def calculate_rs_metrics_from_csv(input_csv: str, output_path: str) -> None:
-    print(f"[init] reading data from {input_csv}")
-    
-    # Read the CSV manually to handle the structure
-    data = []
-    with open(input_csv, 'r', encoding='utf-8-sig') as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            # Clean Change %: remove '%' and convert to float
-            try:
-                change_pct_str = r.get("Change %", "").replace("%", "").strip()
-                change_pct = float(change_pct_str) if change_pct_str else None
-            except ValueError:
-                change_pct = None
-                
-            data.append({
-                "Company": r.get("Company", ""),
-                "Symbol": r.get("Symbol", ""),
-                "period": r.get("period", ""),
-                "Change %": change_pct
-            })
-    
-    if not data:
+    # Typed frame: Parquet from the scraper when current, else a vectorized CSV parse
+    df = load_typed_results(input_csv)
+    if df.empty:
         print("[warn] no data to analyze")
         return
+    for period, since in stale_periods(df).items():
+        print(f"[warn] period '{period}' is stale: RS uses cached data scraped {since}")
 
-    df = pd.DataFrame(data)
+    df = df[["Company", "Symbol", "period", "Change %"]].copy()
     
     # Normalize Company names to uppercase to handle inconsistencies (e.g. WAFA INSURANCE vs WAFA Insurance)
     df["Company"] = df["Company"].astype(str).str.strip().str.upper()
@@ -53,7 +41,9 @@ def calculate_rs_metrics_from_csv(input_csv: str, output_path: str) -> None:
         if p in df_pivot.columns:
             col_name = f"RS_{p.replace(' ', '')}"
             # Calculate rank, round, clip, and convert to nullable integer (Int64)
-            df_pivot[col_name] = (df_pivot[p].rank(pct=True) * 100).round(0).clip(upper=99).astype('Int64')
+            df_pivot[col_name] = pd.Series(
+                percentile_rating(df_pivot[p].to_numpy(dtype=float)), index=df_pivot.index
+            ).astype('Int64')
             rs_cols.append((col_name, weight))
         else:
             print(f"[warn] period '{p}' not found in data")
@@ -131,6 +121,7 @@ def calculate_rs_metrics_from_csv(input_csv: str, output_path: str) -> None:
     # Save as Standard CSV
     df_pivot[final_cols].to_csv(output_path, index=False, encoding="utf-8-sig")
     print(f"[analysis] saved RS analysis to {output_path}")
+    results_store.append(df_pivot[final_cols], results_store.RS_DATASET)
     
     # --- CALCULATE TRADINGVIEW THRESHOLDS ---
     # Calculate weighted performance for each stock (simulates TradingView's totalRsScore)
@@ -242,4 +233,11 @@ def calculate_rs_metrics_from_csv(input_csv: str, output_path: str) -> None:
     print("=" * 60 + "\n")
 
 if __name__ == "__main__":
-    calculate_rs_metrics_from_csv("saudiexchange_results.csv", "saudiexchange_rs_analysis.csv")
+    inputs = fingerprint(["saudiexchange_results.csv", RESULTS_PARQUET, "company_symbols.csv"])
+    if is_fresh("recalculate_rs", inputs):
+        skip_notice("recalculate_rs")
+    else:
+        calculate_rs_metrics_from_csv("saudiexchange_results.csv", "saudiexchange_rs_analysis.csv")
+        record_stage("recalculate_rs", inputs, ["saudiexchange_rs_analysis.csv",
+                                                "saudiexchange_rs_analysis_tv_thresholds.json",
+                                                "saudiexchange_rs_analysis_tv_thresholds.txt"])
@@ -0,0 +1,155 @@
+"""
+Append-only, date-partitioned history of the daily scrapes.
+
+Each run appends its typed rows as one Parquet file under
+``history/<dataset>/scrape_date=YYYY-MM-DD/``. Existing files are never
+rewritten; a second run on the same day adds another part file, and
+``read(..., latest_only=True)`` keeps only the last run per day.
+
+Reading goes through pyarrow.dataset, so a date range only opens the
+partitions it needs and only the requested columns are decoded:
+
+    from results_store import read
+    df = read("rs_analysis", start="2026-01-01", columns=["Symbol", "RS"])
+"""
+
+import os
+from datetime import date, datetime
+from typing import List, Optional, Union
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+HISTORY_ROOT = "history"
+MARKET_DATASET = "market_results"
+RS_DATASET = "rs_analysis"
+PARTITION_KEY = "scrape_date"
+
+DateLike = Union[str, date, datetime]
+
+
+def _date_str(value: DateLike) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def append(df: pd.DataFrame, dataset: str, scrape_date: Optional[DateLike] = None,
+           root: str = HISTORY_ROOT) -> Optional[str]:
+    """Write ``df`` as a new part file in the ``scrape_date`` partition.
+
+    Adds a ``scraped_at`` column (the write time). Returns the file path, or
+    None when pyarrow is missing or ``df`` is empty.
+    """
+    if not PYARROW_AVAILABLE:
+        print("[warn] pyarrow not available, skipping history append")
+        return None
+    if df.empty:
+        return None
+    now = datetime.now()
+    day = _date_str(scrape_date or now)
+    part_dir = os.path.join(root, dataset, f"{PARTITION_KEY}={day}")
+    os.makedirs(part_dir, exist_ok=True)
+    path = os.path.join(part_dir, f"part-{now.strftime('%H%M%S%f')}.parquet")
+    out = df.drop(columns=[PARTITION_KEY], errors="ignore").copy()
+    out["scraped_at"] = now.isoformat(timespec="microseconds")
+    table = pa.Table.from_pandas(out, preserve_index=False)
+    tmp = f"{path}.tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    print(f"[history] appended {len(out)} rows to {path}")
+    return path
+
+
+def _date_range(start: Optional[DateLike], end: Optional[DateLike]) -> Optional["ds.Expression"]:
+    expr = None
+    if start is not None:
+        expr = ds.field(PARTITION_KEY) >= _date_str(start)
+    if end is not None:
+        cond = ds.field(PARTITION_KEY) <= _date_str(end)
+        expr = cond if expr is None else expr & cond
+    return expr
+
+
+def open_dataset(dataset: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+                 root: str = HISTORY_ROOT) -> "ds.Dataset":
+    """Lazy handle on the partitions in ``[start, end]`` (all of them by default).
+
+    Partitions are pruned from the directory names first, then the schema is
+    unified across the remaining part files only, so columns added later
+    (e.g. ``Stale``) read as null for older partitions without opening the
+    footers of the whole history.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required to read the history store")
+    path = os.path.join(root, dataset)
+    partitioning = ds.partitioning(pa.schema([(PARTITION_KEY, pa.string())]), flavor="hive")
+    base = ds.dataset(path, format="parquet", partitioning=partitioning, exclude_invalid_files=True)
+    expr = _date_range(start, end)
+    fragments = list(base.get_fragments(filter=expr) if expr is not None else base.get_fragments())
+    if not fragments:
+        return base
+    schema = pa.unify_schemas([frag.physical_schema for frag in fragments]
+                              + [pa.schema([(PARTITION_KEY, pa.string())])])
+    return ds.dataset([frag.path for frag in fragments], schema=schema, format="parquet",
+                      partitioning=partitioning, partition_base_dir=path)
+
+
+def _scanner(dset: "ds.Dataset", start, end, columns, filter) -> "ds.Scanner":
+    expr = _date_range(start, end)
+    if filter is not None:
+        expr = filter if expr is None else expr & filter
+    if columns is not None and PARTITION_KEY not in columns:
+        columns = [PARTITION_KEY] + list(columns)
+    return dset.scanner(columns=columns, filter=expr)
+
+
+def scan(dataset: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+         columns: Optional[List[str]] = None, filter: Optional["ds.Expression"] = None,
+         root: str = HISTORY_ROOT) -> "ds.Scanner":
+    """Scanner over ``[start, end]`` (inclusive scrape dates) with column and predicate pushdown.
+
+    ``filter`` is an extra pyarrow expression, e.g. ``ds.field("Symbol") == "2222"``.
+    Iterate ``to_batches()`` to stream, or call ``to_table()``.
+    """
+    return _scanner(open_dataset(dataset, start, end, root), start, end, columns, filter)
+
+
+def read(dataset: str, start: Optional[DateLike] = None, end: Optional[DateLike] = None,
+         columns: Optional[List[str]] = None, filter: Optional["ds.Expression"] = None,
+         latest_only: bool = True, root: str = HISTORY_ROOT) -> pd.DataFrame:
+    """Load a date range as a DataFrame sorted by scrape date.
+
+    With ``latest_only`` only the last run of each day is kept, so re-runs
+    on the same day do not double-count. The last run is picked per
+    partition before ``filter`` is applied, so a filtered read never falls
+    back to rows of a superseded run.
+    """
+    if not os.path.isdir(os.path.join(root, dataset)):
+        return pd.DataFrame(columns=[PARTITION_KEY] + list(columns or []))
+    dset = open_dataset(dataset, start, end, root)
+    if latest_only:
+        runs = _scanner(dset, start, end, ["scraped_at"], None).to_table().to_pandas()
+        if not runs.empty:
+            latest = runs.groupby(PARTITION_KEY)["scraped_at"].max()
+            # scraped_at is the write time of one append() call, so it identifies the run
+            run_filter = ds.field("scraped_at").isin(latest.tolist())
+            filter = run_filter if filter is None else run_filter & filter
+    df = _scanner(dset, start, end, columns, filter).to_table().to_pandas()
+    return df.sort_values(PARTITION_KEY, kind="stable").reset_index(drop=True)
+
+
+def available_dates(dataset: str, root: str = HISTORY_ROOT) -> List[str]:
+    """Scrape dates present in ``dataset``, from the directory names only."""
+    path = os.path.join(root, dataset)
+    if not os.path.isdir(path):
+        return []
+    prefix = f"{PARTITION_KEY}="
+    return sorted(d[len(prefix):] for d in os.listdir(path) if d.startswith(prefix))
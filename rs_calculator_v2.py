@@ -1,11 +1,13 @@
 import pandas as pd
 import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, cast, Float
 from app.models.price import Price
 from app.models.rs_daily import RSDaily
 import logging
 import datetime
+from price_loader import stream_query
+from rs_ranking import grouped_percentile_rating
 
 # إعداد الـ Logging
 logging.basicConfig(level=logging.INFO)
@@ -27,24 +29,17 @@ def calculate_and_save_rs_v2(db: Session, target_date=None):
     query = db.query(
         Price.date,
         Price.symbol,
-        Price.close,
+        cast(Price.close, Float),
         Price.company_name
         # ممكن نحتاج volume لو هنستخدمه في شروط السيولة مستقبلاً
     ).order_by(Price.symbol, Price.date)
     
-    prices = query.all()
+    # Streaming بـ yield_per مباشرة في NumPy buffers (بدل all() + list of dicts)
+    df, _ = stream_query(query, {'date': 'date', 'symbol': 'text', 'close': 'float', 'company_name': 'text'})
     
-    if not prices:
+    if df.empty:
         logger.warning("⚠️ No price data found in database.")
         return
-
-    # تحويل لـ DataFrame
-    df = pd.DataFrame([{
-        'date': p.date,
-        'symbol': p.symbol,
-        'close': float(p.close),
-        'company_name': p.company_name
-    } for p in prices])
     
     logger.info(f"📊 Loaded {len(df)} price records.")
 
@@ -87,20 +82,17 @@ def calculate_and_save_rs_v2(db: Session, target_date=None):
     # يمكننا إبقاءها بقيم Null أو حذفها من حسابات الـ Rank
     
     # 4. حساب RS Rating (الترتيب المئوي اليومي) وشمل الترتيب لكل فترة
-    def calculate_daily_rank(day_group):
-        valid_rs = day_group.dropna()
-        if valid_rs.empty:
-            return pd.Series(index=day_group.index, dtype=float)
-        ranks = valid_rs.rank(pct=True) * 100
-        return ranks.round(0).clip(lower=1, upper=99).astype(int)
+    # ترتيب مئوي لكل يوم (1-99، الـ NaN بيفضل NaN) لكل الأيام مرة واحدة
+    def calculate_daily_rank(column):
+        return grouped_percentile_rating(df[column].to_numpy(dtype=float), df['date'].to_numpy(), lower=1)
 
     # تطبيق دالة الترتيب لكل فترة زمنية (عشان نعرضها في الموقع زي الصورة)
     logger.info("⚡ Calculating Ranks per period...")
     
-    df['rank_3m'] = df.groupby('date')['return_3m'].transform(calculate_daily_rank)
-    df['rank_6m'] = df.groupby('date')['return_6m'].transform(calculate_daily_rank)
-    df['rank_9m'] = df.groupby('date')['return_9m'].transform(calculate_daily_rank)
-    df['rank_12m'] = df.groupby('date')['return_12m'].transform(calculate_daily_rank)
+    df['rank_3m'] = calculate_daily_rank('return_3m')
+    df['rank_6m'] = calculate_daily_rank('return_6m')
+    df['rank_9m'] = calculate_daily_rank('return_9m')
+    df['rank_12m'] = calculate_daily_rank('return_12m')
 
     # الخطوة 2: حساب RS Raw من الـ Ranks (الطريقة الجديدة)
     # استخدام Int64 nullable للتعامل مع القيم الفارغة
@@ -112,7 +104,7 @@ def calculate_and_save_rs_v2(db: Session, target_date=None):
     )
 
     # حساب الـ RS النهائي
-    df['rs_rating'] = df.groupby('date')['rs_raw'].transform(calculate_daily_rank)
+    df['rs_rating'] = calculate_daily_rank('rs_raw')
     
     # لو حددنا target_date (عشان التحديث اليومي السريع)، نصفي النتائج دلوقتي
     if target_date:
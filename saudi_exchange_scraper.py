@@ -1,13 +1,28 @@
 import json
 import csv
+import re
 import sys
 import time
-from typing import List, Dict, Optional
+import os
+import shutil
+import subprocess
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urljoin
 import math
 
+from pipeline_manifest import digest_json, is_fresh, record_stage, skip_notice
+
 try:
     import pandas as pd
     import numpy as np
+    from market_data import RESULTS_PARQUET, save_columnar, stale_periods, to_typed_frame
+    import results_store
+    from rs_ranking import percentile_rating
     PANDAS_AVAILABLE = True
 except ImportError:
     PANDAS_AVAILABLE = False
@@ -26,16 +41,220 @@ try:
 except Exception:
     WEBDRIVER_MANAGER_AVAILABLE = False
 
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
 TARGET_URL = "https://www.saudiexchange.sa/wps/portal/saudiexchange/ourmarkets/main-market-watch/main-market-performance/!ut/p/z1/lc_LCsIwEAXQb-kHyFwjSeMyWpr66Mu0WLORrKSgVUT8foO7Up-zG-ZcmEuWGrKdu7cHd2vPnTv6fWfFnisBlkjk2lQKZWyqWTaNx9CgbR_IVAuUmSpzFnLAMLJ_5WEK7kGRTtbY-Lv4LY83o_A9b_tERtHck5VMlsgZRDgAw4p98KLDE3x40rgrXU513aBdjFQQPACfi5Hn/dz/d5/L0lHSkovd0RNQUZrQUVnQSEhLzROVkUvZW4!/"
 
 REPORT_KEYWORDS = ["highest", "low", "percentage", "change"]
 REPORT_AR_KEYWORDS = ["أعلى", "أدنى", "نسبة", "تغير"]
 REPORT_VALUE_TEXT = "Gainers/Losers by Percentage"
+# Report dropdown options by visible text: option value and keyword fallbacks.
+# REPORT_VALUE_TEXT is the primary report behind the legacy output files.
+# Other reports are named by their option text (or value) and matched
+# exactly against the dropdown; their columns come from the table headers.
+REPORTS = {
+    REPORT_VALUE_TEXT: {"value": "gainersPercentage", "keywords": REPORT_KEYWORDS, "ar_keywords": REPORT_AR_KEYWORDS},
+}
 PERIODS = ["1 Year", "9 Months", "6 Months", "3 Months"]
+MARKET_TABLE_IDS = ["marketPerformanceTable1", "marketPerformanceTable2", "marketPerformanceTable3"]
+EXPECTED_HEADERS = ["Company", "Symbol", "Open", "Highest", "Lowest", "Close", "Change", "Change %", "Volume Traded", "Value Traded"]
+
+
+# URL patterns blocked in lean mode. Stylesheets are deliberately left alone:
+# hidden market tables are only hidden by CSS, and the visibility checks in
+# _get_all_tables and the JS extractor rely on it.
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*newrelic.com*", "*nr-data.net*",
+]
+
+LEAN_CHROME_ARGS = [
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--metrics-recording-only",
+    "--renderer-process-limit=2",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--blink-settings=imagesEnabled=false",
+]
+
+
+METRICS_PATH = "saudiexchange_metrics.json"
+METRICS_HISTORY_LIMIT = 90
+
+
+class RunMetrics:
+    """Wall time per phase, row counts and retry/fallback counters for one run.
+
+    Thread-safe so parallel workers can share one instance. Phases carry
+    free-form labels (period, output, worker thread) next to their duration.
+    """
+
+    def __init__(self, **meta):
+        self.meta = meta
+        self.started_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = []
+        self.counters = {}
+        self.row_counts = {}
+
+    @contextmanager
+    def phase(self, name: str, **labels):
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            entry = {"phase": name, "seconds": round(time.perf_counter() - t0, 4), "ok": ok}
+            entry.update(labels)
+            if threading.current_thread() is not threading.main_thread():
+                entry["thread"] = threading.current_thread().name
+            with self._lock:
+                self.phases.append(entry)
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def rows(self, period: str, n: int) -> None:
+        with self._lock:
+            self.row_counts[period] = n
+
+    def summary(self) -> Dict:
+        totals = {}
+        for p in self.phases:
+            totals[p["phase"]] = round(totals.get(p["phase"], 0.0) + p["seconds"], 4)
+        return {
+            "started_at": self.started_at,
+            "total_seconds": round(time.perf_counter() - self._t0, 4),
+            "phase_totals": totals,
+            "rows": dict(self.row_counts),
+            "counters": dict(self.counters),
+            **self.meta,
+        }
+
+    def write(self, path: str = METRICS_PATH) -> None:
+        """Write this run's metrics, keeping a bounded history of earlier run summaries."""
+        history = []
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                history = json.load(f).get("history", [])
+        except (OSError, ValueError, AttributeError):
+            pass
+        summary = self.summary()
+        history = (history + [summary])[-METRICS_HISTORY_LIMIT:]
+        doc = {"latest": dict(summary, phases=self.phases), "history": history}
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(doc, f, ensure_ascii=False, indent=2)
+            print(f"[metrics] run took {summary['total_seconds']:.1f}s, written to {path}")
+        except OSError as e:
+            print(f"[warn] could not write metrics: {e}")
+
+
+DRIVER_MANIFEST_PATH = ".chromedriver_manifest.json"
+_CHROME_VERSION_COMMANDS = [
+    ["google-chrome", "--version"],
+    ["google-chrome-stable", "--version"],
+    ["chromium", "--version"],
+    ["chromium-browser", "--version"],
+    ["/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", "--version"],
+    ["reg", "query", r"HKEY_CURRENT_USER\Software\Google\Chrome\BLBeacon", "/v", "version"],
+]
+_driver_lock = threading.Lock()
+_resolved_driver_path = None
+
+
+def _installed_chrome_version() -> Optional[str]:
+    for cmd in _CHROME_VERSION_COMMANDS:
+        try:
+            out = subprocess.run(cmd, capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        m = re.search(r"(\d+\.\d+\.\d+\.\d+)", out or "")
+        if m:
+            return m.group(1)
+    return None
+
+
+def _load_driver_manifest(path: str = DRIVER_MANIFEST_PATH) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve_chromedriver(offline: Optional[bool] = None) -> Optional[str]:
+    """Return a chromedriver path, re-resolving only when Chrome's version changes.
+
+    The resolved path and the Chrome version it was resolved for are kept in
+    a local manifest. In offline mode (``SCRAPER_OFFLINE=1``) the network is
+    never touched: the manifest or a chromedriver on PATH is used, and
+    Selenium Manager is told to stay offline too. Returns None to let
+    Selenium locate the driver itself.
+    """
+    global _resolved_driver_path
+    if offline is None:
+        offline = os.environ.get("SCRAPER_OFFLINE") == "1"
+    with _driver_lock:
+        if _resolved_driver_path and os.path.exists(_resolved_driver_path):
+            return _resolved_driver_path
+        t0 = time.perf_counter()
+        version = _installed_chrome_version()
+        manifest = _load_driver_manifest()
+        cached = manifest.get("driver_path")
+        if cached and os.path.exists(cached) and (version is None or manifest.get("chrome_version") == version):
+            elapsed = time.perf_counter() - t0
+            saved = manifest.get("resolve_seconds", 0.0) - elapsed
+            print(f"[init] chromedriver from manifest for Chrome {manifest.get('chrome_version')} "
+                  f"in {elapsed:.2f}s (saved ~{max(saved, 0.0):.2f}s)")
+            _resolved_driver_path = cached
+            return cached
+        if offline:
+            os.environ.setdefault("SE_OFFLINE", "true")
+            path = cached if cached and os.path.exists(cached) else shutil.which("chromedriver")
+            if path:
+                print(f"[init] offline: using chromedriver at {path} (Chrome {version or 'unknown'})")
+            else:
+                print("[warn] offline: no cached chromedriver found, leaving it to Selenium")
+            _resolved_driver_path = path
+            return path
+        if not WEBDRIVER_MANAGER_AVAILABLE:
+            return None
+        print(f"[init] resolving chromedriver for Chrome {version or 'unknown'}")
+        path = ChromeDriverManager().install()
+        elapsed = time.perf_counter() - t0
+        print(f"[init] chromedriver resolved in {elapsed:.2f}s")
+        manifest = {"chrome_version": version, "driver_path": path, "resolve_seconds": round(elapsed, 3),
+                    "resolved_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        try:
+            with open(DRIVER_MANIFEST_PATH, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+        except OSError as e:
+            print(f"[warn] could not write driver manifest: {e}")
+        _resolved_driver_path = path
+        return path
 
 
-def build_driver(headless: bool = True) -> webdriver.Chrome:
-    print("[init] starting Chrome driver")
+def build_driver(headless: bool = True, lean: bool = False) -> webdriver.Chrome:
+    print(f"[init] starting Chrome driver{' (lean)' if lean else ''}")
     opts = Options()
     ua = (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -49,53 +268,267 @@ def build_driver(headless: bool = True) -> webdriver.Chrome:
     opts.add_argument("--window-size=1400,900")
     if headless:
         opts.add_argument("--headless=new")
-    if WEBDRIVER_MANAGER_AVAILABLE:
-        service = Service(ChromeDriverManager().install())
-    else:
-        service = Service()
+    if lean:
+        # open_target waits for the controls/tables itself, so there is no
+        # need to block on images and late scripts finishing.
+        opts.page_load_strategy = "eager"
+        for arg in LEAN_CHROME_ARGS:
+            opts.add_argument(arg)
+    driver_path = resolve_chromedriver()
+    service = Service(driver_path) if driver_path else Service()
     driver = webdriver.Chrome(service=service, options=opts)
+    if lean:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+        except Exception as e:
+            print(f"[warn] could not enable resource blocking: {e}")
     return driver
 
 
-def open_target(driver: webdriver.Chrome) -> WebDriverWait:
-    print("[nav] opening target URL")
-    driver.get(TARGET_URL)
-    wait = WebDriverWait(driver, 30)
+def _browser_peak_rss_kb(driver: webdriver.Chrome) -> Optional[int]:
+    """Sum of peak RSS (VmHWM) over the browser processes started by chromedriver.
+
+    Linux only (reads /proc); returns None elsewhere. Summing per-process
+    peaks slightly overstates the true simultaneous peak but is stable
+    enough to compare modes.
+    """
     try:
-        wait.until(
-            EC.any_of(
-                EC.presence_of_element_located((By.ID, "reportList")),
-                EC.presence_of_element_located((By.NAME, "reportFilter")),
-                EC.presence_of_element_located((By.ID, "periodList")),
-                EC.presence_of_element_located((By.NAME, "timeFrameFilter")),
-                EC.presence_of_element_located((By.XPATH, "//table")),
+        root = driver.service.process.pid
+    except Exception:
+        return None
+    if not os.path.isdir("/proc"):
+        return None
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total = 0
+    stack = list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def compare_driver_modes(headless: bool = True, rounds: int = 2) -> Dict[str, Dict[str, Optional[float]]]:
+    """Report navigation time and browser peak RSS for the default and lean drivers.
+
+    The order alternates every round (default first, then lean first) so
+    neither mode always runs against the cache the other one warmed; the
+    report holds the median of each mode over ``rounds``.
+    """
+    samples = {"default": [], "lean": []}
+    modes = [("default", False), ("lean", True)]
+    for r in range(rounds):
+        for mode, lean in (modes if r % 2 == 0 else modes[::-1]):
+            driver = build_driver(headless=headless, lean=lean)
+            try:
+                t0 = time.perf_counter()
+                open_target(driver)
+                nav = time.perf_counter() - t0
+                rss = _browser_peak_rss_kb(driver)
+                samples[mode].append((nav, rss))
+                rss_txt = f"{rss / 1024:.0f} MB" if rss is not None else "n/a"
+                print(f"[bench] round {r + 1} {mode}: navigation={nav:.2f}s browser peak RSS={rss_txt}")
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+    report = {}
+    for mode, runs in samples.items():
+        rss_values = [rss for _, rss in runs if rss is not None]
+        report[mode] = {
+            "navigation_seconds": statistics.median([nav for nav, _ in runs]),
+            "peak_rss_mb": statistics.median(rss_values) / 1024 if rss_values else None,
+        }
+    d, l = report["default"], report["lean"]
+    if d["peak_rss_mb"] is not None and l["peak_rss_mb"] is not None:
+        rss_saved = f"{d['peak_rss_mb'] - l['peak_rss_mb']:.0f} MB"
+    else:
+        rss_saved = "n/a"
+    print(f"[bench] lean saves {d['navigation_seconds'] - l['navigation_seconds']:.2f}s navigation "
+          f"and {rss_saved} peak RSS (median of {rounds} rounds)")
+    return report
+
+
+FRAME_CACHE_PATH = ".scraper_frame_cache.json"
+
+
+def open_target(driver: webdriver.Chrome, url: str = TARGET_URL, metrics: Optional[RunMetrics] = None,
+                frame_cache_path: str = FRAME_CACHE_PATH) -> WebDriverWait:
+    metrics = metrics or RunMetrics()
+    print("[nav] opening target URL")
+    with metrics.phase("navigation"):
+        driver.get(url)
+        wait = WebDriverWait(driver, 30)
+        try:
+            wait.until(
+                EC.any_of(
+                    EC.presence_of_element_located((By.ID, "reportList")),
+                    EC.presence_of_element_located((By.NAME, "reportFilter")),
+                    EC.presence_of_element_located((By.ID, "periodList")),
+                    EC.presence_of_element_located((By.NAME, "timeFrameFilter")),
+                    EC.presence_of_element_located((By.XPATH, "//table")),
+                )
             )
-        )
-    except TimeoutException:
-        pass
+        except TimeoutException:
+            metrics.count("navigation_timeouts")
+    with metrics.phase("frame_discovery"):
+        try:
+            if locate_target_frame(driver, url, frame_cache_path):
+                return WebDriverWait(driver, 30)
+            driver.switch_to.default_content()
+        except Exception:
+            driver.switch_to.default_content()
+    return wait
+
+
+class _QueryCounter:
+    """Counts WebDriver round trips (element lookups, attribute reads) issued during frame discovery."""
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, n: int = 1) -> None:
+        self.count += n
+
+
+def _load_frame_cache(url: str = TARGET_URL, path: str = FRAME_CACHE_PATH) -> Dict:
     try:
-        if switch_to_frame_with_table(driver) or switch_to_frame_with_controls(driver):
-            return WebDriverWait(driver, 30)
-        driver.switch_to.default_content()
-    except Exception:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if cache.get("url") == url else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_frame_cache(cache: Dict, url: str = TARGET_URL, path: str = FRAME_CACHE_PATH) -> None:
+    cache = dict(cache, url=url)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[warn] could not write frame cache: {e}")
+
+
+def _frame_ref(fr: webdriver.remote.webelement.WebElement, index: int,
+               counter: Optional[_QueryCounter] = None) -> Dict:
+    ref = {"index": index}
+    for attr in ("id", "name"):
+        if counter is not None:
+            counter.add()
+        try:
+            val = fr.get_attribute(attr)
+        except Exception:
+            val = None
+        if val:
+            ref[attr] = val
+    return ref
+
+
+def _enter_frame_path(driver: webdriver.Chrome, path: List[Dict],
+                      counter: Optional[_QueryCounter] = None) -> None:
+    # switch_to.frame(str) is itself a find_element by ID and, if that
+    # fails, by NAME before the switch; only an int index switches without
+    # a lookup. id/name are kept first because they survive iframes being
+    # added or reordered around the target.
+    driver.switch_to.default_content()
+    for ref in path:
+        if counter is not None and (ref.get("id") or ref.get("name")):
+            counter.add(1 if ref.get("id") else 2)
+        driver.switch_to.frame(ref.get("id") or ref.get("name") or ref["index"])
+
+
+def _frame_has(driver: webdriver.Chrome, kind: str, counter: _QueryCounter) -> bool:
+    if kind == "table":
+        counter.add()
+        try:
+            return bool(driver.find_elements(By.XPATH, "//table"))
+        except Exception:
+            return False
+    return _has_target_controls(driver, counter)
+
+
+def locate_target_frame(driver: webdriver.Chrome, url: str = TARGET_URL,
+                        cache_path: str = FRAME_CACHE_PATH) -> bool:
+    """Switch into the frame holding the tables (or, failing that, the controls).
+
+    Every previously discovered frame path is tried first and validated;
+    the full iframe DFS only runs when none is cached or none still leads
+    to the right frame. A rediscovered path is merged into the cache, and
+    stale paths are dropped from it.
+    """
+    cache = _load_frame_cache(url, cache_path)
+    stale = []
+    for kind in ("table", "controls"):
+        entry = cache.get(kind)
+        if not entry:
+            continue
+        counter = _QueryCounter()
+        try:
+            _enter_frame_path(driver, entry["path"], counter)
+            if _frame_has(driver, kind, counter):
+                saved = max(0, entry.get("dfs_queries", 0) - counter.count)
+                print(f"[nav] cached frame path for {kind} is valid "
+                      f"({counter.count} round trips, saved {saved})")
+                return True
+        except Exception:
+            pass
+        print(f"[nav] cached frame path for {kind} is stale")
+        stale.append(kind)
         driver.switch_to.default_content()
-    return wait
+    if stale:
+        print("[nav] no cached frame path is valid, rediscovering")
+    for kind, dfs in (("table", switch_to_frame_with_table), ("controls", switch_to_frame_with_controls)):
+        counter = _QueryCounter()
+        path = []
+        if dfs(driver, counter=counter, path_out=path):
+            print(f"[nav] found {kind} frame at depth {len(path)} after {counter.count} round trips")
+            kept = {k: v for k, v in cache.items() if k not in stale and k != "url"}
+            kept[kind] = {"path": path, "dfs_queries": counter.count}
+            _save_frame_cache(kept, url, cache_path)
+            return True
+    return False
 
 
-def _has_target_controls(driver: webdriver.Chrome) -> bool:
+def _has_target_controls(driver: webdriver.Chrome, counter: Optional[_QueryCounter] = None) -> bool:
+    counter = counter or _QueryCounter()
     try:
+        counter.add()
         driver.find_element(By.XPATH, "//label[normalize-space()='Report']")
+        counter.add()
         driver.find_element(By.XPATH, "//label[normalize-space()='Period']")
         return True
     except NoSuchElementException:
         pass
     try:
+        counter.add()
         selects = driver.find_elements(By.TAG_NAME, "select")
         if len(selects) >= 2:
             return True
     except Exception:
         pass
     try:
+        counter.add()
         cbs = driver.find_elements(By.XPATH, "//*[@role='combobox']")
         if len(cbs) >= 2:
             return True
@@ -104,14 +537,23 @@ def _has_target_controls(driver: webdriver.Chrome) -> bool:
     return False
 
 
-def switch_to_frame_with_controls(driver: webdriver.Chrome, max_depth: int = 3) -> bool:
+def switch_to_frame_with_controls(driver: webdriver.Chrome, max_depth: int = 3,
+                                  counter: Optional[_QueryCounter] = None,
+                                  path_out: Optional[List[Dict]] = None) -> bool:
+    counter = counter or _QueryCounter()
+    path = []
+    found_path = []
+
     def _dfs(depth: int) -> bool:
         if depth > max_depth:
             return False
-        if _has_target_controls(driver):
+        if _has_target_controls(driver, counter):
+            found_path[:] = path
             return True
+        counter.add()
         frames = driver.find_elements(By.TAG_NAME, "iframe")
-        for fr in frames:
+        for i, fr in enumerate(frames):
+            path.append(_frame_ref(fr, i, counter))
             try:
                 driver.switch_to.frame(fr)
                 if _dfs(depth + 1):
@@ -119,25 +561,43 @@ def switch_to_frame_with_controls(driver: webdriver.Chrome, max_depth: int = 3)
             except Exception:
                 pass
             finally:
+                path.pop()
                 driver.switch_to.parent_frame()
         return False
 
     driver.switch_to.default_content()
-    return _dfs(0)
+    found = _dfs(0)
+    if found:
+        # The DFS unwinds back to the top document on its way out, so step
+        # back into the frame it found.
+        _enter_frame_path(driver, found_path, counter)
+        if path_out is not None:
+            path_out[:] = found_path
+    return found
+
+
+def switch_to_frame_with_table(driver: webdriver.Chrome, max_depth: int = 3,
+                               counter: Optional[_QueryCounter] = None,
+                               path_out: Optional[List[Dict]] = None) -> bool:
+    counter = counter or _QueryCounter()
+    path = []
+    found_path = []
 
-
-def switch_to_frame_with_table(driver: webdriver.Chrome, max_depth: int = 3) -> bool:
     def _dfs(depth: int) -> bool:
         if depth > max_depth:
             return False
         try:
+            counter.add()
             tbls = driver.find_elements(By.XPATH, "//table")
             if tbls:
+                found_path[:] = path
                 return True
         except Exception:
             pass
+        counter.add()
         frames = driver.find_elements(By.TAG_NAME, "iframe")
-        for fr in frames:
+        for i, fr in enumerate(frames):
+            path.append(_frame_ref(fr, i, counter))
             try:
                 driver.switch_to.frame(fr)
                 if _dfs(depth + 1):
@@ -145,11 +605,19 @@ def switch_to_frame_with_table(driver: webdriver.Chrome, max_depth: int = 3) ->
             except Exception:
                 pass
             finally:
+                path.pop()
                 driver.switch_to.parent_frame()
         return False
 
     driver.switch_to.default_content()
-    return _dfs(0)
+    found = _dfs(0)
+    if found:
+        # The DFS unwinds back to the top document on its way out, so step
+        # back into the frame it found.
+        _enter_frame_path(driver, found_path, counter)
+        if path_out is not None:
+            path_out[:] = found_path
+    return found
 
 
 def _find_dropdown_by_label(driver: webdriver.Chrome, label_text: str) -> Optional[webdriver.remote.webelement.WebElement]:
@@ -239,7 +707,9 @@ def select_any_dropdown_value(driver: webdriver.Chrome, wait: WebDriverWait, val
     return False
 
 
-def _select_native_select(el: webdriver.remote.webelement.WebElement, visible_text: Optional[str] = None, keywords: Optional[List[str]] = None) -> bool:
+def _select_native_select(el: webdriver.remote.webelement.WebElement, visible_text: Optional[str] = None, keywords: Optional[List[str]] = None,
+                          ar_keywords: Optional[List[str]] = None) -> bool:
+    ar_keywords = REPORT_AR_KEYWORDS if ar_keywords is None else ar_keywords
     try:
         sel = Select(el)
         if visible_text:
@@ -255,7 +725,7 @@ def _select_native_select(el: webdriver.remote.webelement.WebElement, visible_te
                 if all(k in t_en for k in [k.lower() for k in keywords]):
                     opt.click()
                     return True
-                if all(k in t_ar for k in REPORT_AR_KEYWORDS):
+                if ar_keywords and all(k in t_ar for k in ar_keywords):
                     opt.click()
                     return True
         return False
@@ -321,54 +791,103 @@ def _select_from_combobox(driver: webdriver.Chrome, text: Optional[str] = None,
             return False
 
 
-def select_report(driver: webdriver.Chrome, wait: WebDriverWait) -> None:
-    print("[select] choosing report option")
+# What a select_* call did: picked through a native <select> (an unchanged
+# value then means the option was already selected), picked through a
+# combobox (no value to compare), or found no matching option at all.
+SELECT_NATIVE, SELECT_COMBOBOX, SELECT_FAILED = "native", "combobox", "failed"
+
+
+def _match_option(options: List[Tuple[str, str]], name: str) -> Optional[int]:
+    """Index of the ``(text, value)`` option whose text or value is ``name`` (case-insensitive)."""
+    key = " ".join(name.split()).lower()
+    for i, (text, value) in enumerate(options):
+        if " ".join((text or "").split()).lower() == key or (value or "").strip().lower() == key:
+            return i
+    return None
+
+
+def select_report(driver: webdriver.Chrome, wait: WebDriverWait, report: str = REPORT_VALUE_TEXT) -> str:
+    """Pick ``report`` in the Report dropdown.
+
+    Returns SELECT_NATIVE, SELECT_COMBOBOX or SELECT_FAILED. Reports
+    outside REPORTS have no keyword fallbacks: they must match an option's
+    text or value exactly.
+    """
+    print(f"[select] choosing report option: {report}")
+    spec = REPORTS.get(report)
+    if spec is None:
+        return _select_report_exact(driver, wait, report)
+    keywords = spec.get("keywords") or [report]
+    ar_keywords = spec.get("ar_keywords") or []
     el = _find_select_by_ids_or_names(driver, ["reportList", "reportFilter"]) or _find_dropdown_by_label(driver, "Report")
     if not el:
         print("[warn] report dropdown not found — trying global dropdown search")
         # Try global dropdown search for the specific value
-        if select_any_dropdown_value(driver, wait, [REPORT_VALUE_TEXT]):
-            return
-        return
+        return SELECT_COMBOBOX if select_any_dropdown_value(driver, wait, [report]) else SELECT_FAILED
     if el.tag_name.lower() == "select":
         # Prefer exact value if present
         try:
             sel = Select(el)
-            try:
-                sel.select_by_value("gainersPercentage")
-                return
-            except Exception:
-                pass
-            ok = _select_native_select(el, visible_text=REPORT_VALUE_TEXT)
+            if spec.get("value"):
+                try:
+                    sel.select_by_value(spec["value"])
+                    return SELECT_NATIVE
+                except Exception:
+                    pass
+            ok = _select_native_select(el, visible_text=report)
         except Exception:
             ok = False
         if not ok:
-            if not _select_native_select(el, keywords=REPORT_KEYWORDS):
-                _select_native_select(el, keywords=REPORT_AR_KEYWORDS)
-        return
+            ok = _select_native_select(el, keywords=keywords, ar_keywords=ar_keywords) or \
+                (bool(ar_keywords) and _select_native_select(el, keywords=ar_keywords, ar_keywords=ar_keywords))
+        return SELECT_NATIVE if ok else SELECT_FAILED
     _open_combobox(el, wait)
     # Try exact value first, then keywords
-    if not _select_from_combobox(driver, text=REPORT_VALUE_TEXT, wait=wait):
-        if not _select_from_combobox(driver, keywords=REPORT_KEYWORDS, wait=wait):
-            _select_from_combobox(driver, keywords=REPORT_AR_KEYWORDS, wait=wait)
+    ok = _select_from_combobox(driver, text=report, wait=wait) or \
+        _select_from_combobox(driver, keywords=keywords, wait=wait) or \
+        (bool(ar_keywords) and _select_from_combobox(driver, keywords=ar_keywords, wait=wait))
+    return SELECT_COMBOBOX if ok else SELECT_FAILED
 
 
-def select_period(driver: webdriver.Chrome, wait: WebDriverWait, period_text: str) -> None:
+def _select_report_exact(driver: webdriver.Chrome, wait: WebDriverWait, report: str) -> str:
+    el = _find_select_by_ids_or_names(driver, ["reportList", "reportFilter"]) or _find_dropdown_by_label(driver, "Report")
+    if not el:
+        print(f"[warn] report dropdown not found for {report!r}")
+        return SELECT_FAILED
+    if el.tag_name.lower() == "select":
+        sel = Select(el)
+        i = _match_option([(o.text, o.get_attribute("value")) for o in sel.options], report)
+        if i is None:
+            print(f"[warn] report option not found: {report}")
+            return SELECT_FAILED
+        sel.select_by_index(i)
+        return SELECT_NATIVE
+    _open_combobox(el, wait)
+    return SELECT_COMBOBOX if _select_from_combobox(driver, text=report, wait=wait) else SELECT_FAILED
+
+
+def _period_variants(period_text: str) -> List[str]:
+    """English/Arabic option texts that identify a period in the dropdown."""
+    pt = period_text.lower()
+    if "year" in pt:
+        return ["1 Year", "Year", "سنة", "عام"]
+    if "months" in pt and "9" in pt:
+        return ["9 Months", "9 أشهر", "٩ أشهر"]
+    if "months" in pt and "6" in pt:
+        return ["6 Months", "6 أشهر", "٦ أشهر"]
+    if "months" in pt and "3" in pt:
+        return ["3 Months", "3 أشهر", "٣ أشهر"]
+    return [period_text]
+
+
+def select_period(driver: webdriver.Chrome, wait: WebDriverWait, period_text: str) -> str:
+    """Pick ``period_text`` in the Period dropdown; returns SELECT_NATIVE, SELECT_COMBOBOX or SELECT_FAILED."""
     print(f"[select] period: {period_text}")
     el = _find_select_by_ids_or_names(driver, ["periodList", "periodFilter", "period"]) or _find_dropdown_by_label(driver, "Period")
     if not el:
         print("[warn] period dropdown not found")
-        return
-    variants = [period_text]
-    pt = period_text.lower()
-    if "year" in pt:
-        variants = ["1 Year", "Year", "سنة", "عام"]
-    elif "months" in pt and "9" in pt:
-        variants = ["9 Months", "9 أشهر", "٩ أشهر"]
-    elif "months" in pt and "6" in pt:
-        variants = ["6 Months", "6 أشهر", "٦ أشهر"]
-    elif "months" in pt and "3" in pt:
-        variants = ["3 Months", "3 أشهر", "٣ أشهر"]
+        return SELECT_FAILED
+    variants = _period_variants(period_text)
     if el.tag_name.lower() == "select":
         # Prefer direct visible text selection
         ok = False
@@ -383,25 +902,19 @@ def select_period(driver: webdriver.Chrome, wait: WebDriverWait, period_text: st
                     continue
         except Exception:
             ok = False
-        for v in variants:
-            ok = _select_native_select(el, visible_text=v)
-            if ok:
-                break
         if not ok:
-            for v in variants:
-                if _select_native_select(el, keywords=[v]):
-                    ok = True
-                    break
-        return
+            ok = any(_select_native_select(el, visible_text=v) for v in variants) or \
+                any(_select_native_select(el, keywords=[v]) for v in variants)
+        return SELECT_NATIVE if ok else SELECT_FAILED
     _open_combobox(el, wait)
     for v in variants:
         if _select_from_combobox(driver, text=v, wait=wait):
-            return
+            return SELECT_COMBOBOX
     for v in variants:
         if _select_from_combobox(driver, keywords=[v], wait=wait):
-            return
+            return SELECT_COMBOBOX
     # As a last resort, search all dropdowns and pick the value
-    select_any_dropdown_value(driver, wait, variants)
+    return SELECT_COMBOBOX if select_any_dropdown_value(driver, wait, variants) else SELECT_FAILED
 
 
 def _get_all_tables(driver: webdriver.Chrome) -> List[webdriver.remote.webelement.WebElement]:
@@ -409,7 +922,7 @@ def _get_all_tables(driver: webdriver.Chrome) -> List[webdriver.remote.webelemen
     tables = []
     
     # Get marketPerformanceTable 1 (Main), 2 (Gainers), and 3 (Losers)
-    for table_id in ["marketPerformanceTable1", "marketPerformanceTable2", "marketPerformanceTable3"]:
+    for table_id in MARKET_TABLE_IDS:
         try:
             tbl = driver.find_element(By.ID, table_id)
             if tbl.is_displayed():
@@ -502,20 +1015,21 @@ def _first_cell_text(driver: webdriver.Chrome) -> Optional[str]:
     return None
 
 
-def wait_for_table_update(driver: webdriver.Chrome, wait: WebDriverWait, previous_first_cell: Optional[str]) -> None:
+def wait_for_table_update(driver: webdriver.Chrome, wait: WebDriverWait, previous_first_cell: Optional[str]) -> bool:
+    """Poll until the table shows up (and differs from ``previous_first_cell``). False on timeout."""
     print(f"[debug] waiting for table update. prev='{previous_first_cell}'")
     try:
         wait.until(lambda d: (_get_table(d) is not None) or (_get_tables_via_js(d) not in (None, [])) or (_get_grid_via_js(d) not in (None, [])))
     except TimeoutException:
         print("[warn] timeout waiting for table presence")
-        return
+        return False
     if previous_first_cell is None:
         try:
             wait.until(lambda d: _first_cell_text(d) not in (None, ""))
         except TimeoutException:
             print("[warn] timeout waiting for first cell content")
-            return
-        return
+            return False
+        return True
     try:
         def check_change(d):
             curr = _first_cell_text(d)
@@ -524,76 +1038,304 @@ def wait_for_table_update(driver: webdriver.Chrome, wait: WebDriverWait, previou
         wait.until(check_change)
     except TimeoutException:
         print(f"[warn] timeout waiting for table cell change (prev='{previous_first_cell}')")
-        pass
+        return False
+    return True
+
+
+# Installs a MutationObserver on the document that only reacts to changes
+# inside (or replacing) the marketPerformanceTable* tables. It is armed
+# *before* a dropdown is changed so a fast re-render cannot slip past us, and
+# it snapshots the native <select> values so a no-op selection can be told
+# apart from a slow one.
+_ARM_TABLE_WATCH_JS = """
+return (function(ids){
+  const prev = window.__mpWatch;
+  if (prev) { try { prev.observer.disconnect(); } catch(e){} if (prev.timer) clearTimeout(prev.timer); }
+  const selector = ids.map(function(id){ return '#' + id; }).join(',');
+  const st = {changed: false, last: 0, resolve: null, timer: null, observer: null,
+              selects: Array.from(document.querySelectorAll('select')).map(function(s){ return s.value; })};
+  function relevant(node){
+    if (!node) return false;
+    const el = node.nodeType === 1 ? node : node.parentElement;
+    if (!el) return false;
+    if (el.closest && el.closest(selector)) return true;
+    return !!(el.matches && (el.matches(selector) || (el.querySelector && el.querySelector(selector))));
+  }
+  st.observer = new MutationObserver(function(muts){
+    for (let i = 0; i < muts.length; i++) {
+      const m = muts[i];
+      if (relevant(m.target) || Array.from(m.addedNodes).some(relevant) || Array.from(m.removedNodes).some(relevant)) {
+        st.changed = true;
+        st.last = Date.now();
+        if (st.resolve) st.resolve();
+        return;
+      }
+    }
+  });
+  st.observer.observe(document.body || document.documentElement, {childList: true, subtree: true, characterData: true});
+  window.__mpWatch = st;
+  return document.querySelectorAll(selector).length;
+})(arguments[0]);
+"""
+
+# Resolves through execute_async_script once the watched tables have been
+# quiet for ``quiet_ms`` after the first relevant mutation, or with 'timeout'.
+# With ``allowNoop`` (the selection was made on a native <select>) it
+# resolves immediately with 'noop' when no native <select> changed value;
+# combobox selections never touch native selects, so they always wait.
+_WAIT_TABLE_CHANGE_JS = """
+const quietMs = arguments[0], timeoutMs = arguments[1], allowNoop = arguments[2];
+const done = arguments[arguments.length - 1];
+const st = window.__mpWatch;
+if (!st) { done('unarmed'); return; }
+let finished = false;
+function finish(result){
+  if (finished) return;
+  finished = true;
+  if (st.timer) clearTimeout(st.timer);
+  clearTimeout(deadline);
+  st.resolve = null;
+  try { st.observer.disconnect(); } catch(e){}
+  done(result);
+}
+function settle(){
+  if (st.timer) clearTimeout(st.timer);
+  st.timer = setTimeout(function(){ finish('changed'); }, quietMs);
+}
+const deadline = setTimeout(function(){ finish(st.changed ? 'changed' : 'timeout'); }, timeoutMs);
+if (st.changed) { settle(); }
+else {
+  const now = Array.from(document.querySelectorAll('select')).map(function(s){ return s.value; });
+  if (allowNoop && now.length && now.length === st.selects.length && now.every(function(v, i){ return v === st.selects[i]; })) {
+    finish('noop');
+  } else {
+    st.resolve = settle;
+  }
+}
+"""
+
+
+def arm_table_watch(driver: webdriver.Chrome) -> bool:
+    """Start observing the market tables. Call this before changing a dropdown."""
+    try:
+        return driver.execute_script(_ARM_TABLE_WATCH_JS, MARKET_TABLE_IDS) is not None
+    except Exception as e:
+        print(f"[warn] could not install table observer: {e}")
+        return False
+
 
+def wait_for_table_change(driver: webdriver.Chrome, timeout: float = 30, quiet_ms: int = 150,
+                          allow_noop: bool = False) -> Optional[str]:
+    """Block until the armed observer sees the tables change.
 
-def scrape_all_tables(driver: webdriver.Chrome) -> List[Dict[str, str]]:
+    Returns ``"changed"``, ``"noop"`` (only with ``allow_noop``: the
+    selection did not change any native select), ``"timeout"``, or None
+    when the observer is unavailable and the caller should fall back to
+    polling.
+    """
+    try:
+        driver.set_script_timeout(timeout + 5)
+        result = driver.execute_async_script(_WAIT_TABLE_CHANGE_JS, quiet_ms, int(timeout * 1000), allow_noop)
+    except Exception as e:
+        print(f"[warn] table observer wait failed: {e}")
+        return None
+    if result == "unarmed":
+        return None
+    if result == "timeout":
+        print("[warn] timeout waiting for table change (observer)")
+    return result
+
+
+def select_and_wait(driver: webdriver.Chrome, wait: WebDriverWait, select_fn,
+                    metrics: Optional[RunMetrics] = None, phase: str = "select", **labels) -> bool:
+    """Run ``select_fn`` and wait for the tables to reflect it.
+
+    Uses the MutationObserver wait when it can be installed and falls back
+    to polling ``_first_cell_text`` otherwise. ``select_fn`` returns one of
+    the SELECT_* outcomes; only a native pick lets an unchanged select
+    value count as a no-op instead of waiting. Raises ValueError when
+    ``select_fn`` found no option to pick, so the old table is never taken
+    for the new one. Returns False on timeout.
+    """
+    metrics = metrics or RunMetrics()
+    # Taken in either case: the polling fallback needs it if the observer wait fails
+    prev = _first_cell_text(driver)
+    armed = arm_table_watch(driver)
+    with metrics.phase(phase, **labels):
+        outcome = select_fn()
+    if outcome == SELECT_FAILED:
+        metrics.count("select_failures")
+        raise ValueError(f"{phase}: no matching option" + "".join(f", {k}={v}" for k, v in labels.items()))
+    with metrics.phase(f"wait_{phase.replace('select_', '')}", **labels):
+        if armed:
+            result = wait_for_table_change(driver, allow_noop=outcome == SELECT_NATIVE)
+            if result is not None:
+                if result == "timeout":
+                    metrics.count("wait_timeouts")
+                return result != "timeout"
+            print("[info] falling back to polling wait")
+            metrics.count("wait_fallbacks")
+        ok = wait_for_table_update(driver, wait, prev)
+        if not ok:
+            metrics.count("wait_timeouts")
+        return ok
+
+
+# Pulls every visible marketPerformanceTable* in a single WebDriver round trip.
+# Visibility mirrors Selenium's is_displayed() closely enough for these tables
+# (hidden tabs are display:none, so they have no client rects). The symbol is
+# parsed from the first cell's link the same way the Selenium path does it.
+_EXTRACT_MARKET_TABLES_JS = """
+return (function(ids){
+  const out = [];
+  ids.forEach(function(id){
+    const t = document.getElementById(id);
+    if (!t) { out.push({id: id, found: false, visible: false, rows: []}); return; }
+    const visible = t.getClientRects().length > 0 &&
+      window.getComputedStyle(t).visibility !== 'hidden';
+    let ths = t.querySelectorAll('thead th');
+    if (!ths.length) {
+      const first = t.querySelector('tr');
+      ths = first && !first.querySelector('td') ? first.querySelectorAll('th') : [];
+    }
+    const headers = Array.from(ths).map(function(th){ return (th.innerText || '').trim(); });
+    let trs = t.querySelectorAll('tbody > tr');
+    if (!trs.length) { trs = Array.from(t.querySelectorAll('tr')).slice(1); }
+    const rows = [];
+    Array.from(trs).forEach(function(tr){
+      const tds = tr.querySelectorAll('td');
+      if (!tds.length) { return; }
+      const cells = Array.from(tds).map(function(td){ return (td.innerText || '').trim(); });
+      let symbol = '';
+      const a = tds[0].querySelector('a');
+      if (a) {
+        const m = /\\/(\\d{4})/.exec(a.href || '');
+        if (m) { symbol = m[1]; }
+      }
+      if (!symbol) {
+        const m = /(\\d{4})/.exec(cells[0]);
+        if (m) { symbol = m[1]; }
+      }
+      rows.push({symbol: symbol, cells: cells});
+    });
+    out.push({id: id, found: true, visible: visible, headers: headers, rows: rows});
+  });
+  return out;
+})(arguments[0]);
+"""
+
+
+# Header texts that name an EXPECTED_HEADERS column differently.
+_HEADER_ALIASES = {"change (%)": "Change %", "% change": "Change %", "high": "Highest", "low": "Lowest",
+                   "volume": "Volume Traded", "value": "Value Traded"}
+
+
+def _column_fields(headers: Optional[List[str]], n_cells: int) -> Optional[List[str]]:
+    """Row keys for a table's columns, read from its header cells.
+
+    Headers naming an EXPECTED_HEADERS column (case-insensitively, or via
+    _HEADER_ALIASES) map onto it; any other header is kept as its own
+    key. None when the headers do not line up with the cells or name no
+    Company column (e.g. the Arabic page), so the fixed layout applies.
+    """
+    if not headers or len(headers) != n_cells:
+        return None
+    known = {h.lower(): h for h in EXPECTED_HEADERS}
+    known.update(_HEADER_ALIASES)
+    fields = []
+    for h in headers:
+        text = " ".join(h.split())
+        fields.append(known.get(text.lower(), text))
+    return fields if "Company" in fields else None
+
+
+def _report_headers(report: str, headers: Optional[List[str]]) -> Optional[List[str]]:
+    # The primary report keeps the fixed layout its outputs were built on;
+    # only the extra reports, whose columns differ, are read by header.
+    return None if report == REPORT_VALUE_TEXT else headers
+
+
+def _build_row(cells: List[str], symbol: str, headers: Optional[List[str]] = None) -> Dict[str, str]:
+    fields = _column_fields(headers, len(cells))
+    if fields is None:
+        # The page has no Symbol column; it is injected at index 1 and the
+        # remaining cells map onto Open..Value Traded in order.
+        row = {"Company": cells[0], "Symbol": symbol}
+        for i, h in enumerate(EXPECTED_HEADERS[2:]):
+            row[h] = cells[i + 1] if i + 1 < len(cells) else ""
+        return row
+    # Each report has its own column set; columns it lacks stay empty
+    row = {"Company": "", "Symbol": symbol}
+    for field, cell in zip(fields, cells):
+        row[field] = (symbol or cell) if field == "Symbol" else cell
+    for h in EXPECTED_HEADERS:
+        row.setdefault(h, "")
+    return row
+
+
+def _scrape_all_tables_via_js(driver: webdriver.Chrome, report: str = REPORT_VALUE_TEXT) -> Optional[List[Dict[str, str]]]:
+    """Extract all market tables with one execute_script call.
+
+    Returns None when the script fails so callers can fall back to the
+    element-by-element Selenium path.
+    """
+    try:
+        tables = driver.execute_script(_EXTRACT_MARKET_TABLES_JS, MARKET_TABLE_IDS)
+    except Exception as e:
+        print(f"[warn] JS table extraction failed: {e}")
+        return None
+    if not isinstance(tables, list):
+        return None
+    all_rows = []
+    for t in tables:
+        if not t.get("found"):
+            continue
+        if not t.get("visible"):
+            print(f"[debug] found hidden table by ID: {t.get('id')} - skipping")
+            continue
+        rows = t.get("rows") or []
+        print(f"[debug] processing JS table {t.get('id')}: {len(rows)} rows")
+        for r in rows:
+            cells = r.get("cells") or []
+            if cells:
+                all_rows.append(_build_row(cells, r.get("symbol") or "", _report_headers(report, t.get("headers"))))
+    print(f"[debug] total rows collected via JS: {len(all_rows)}")
+    return all_rows
+
+
+def scrape_all_tables(driver: webdriver.Chrome, use_js: bool = True, metrics: Optional[RunMetrics] = None,
+                      report: str = REPORT_VALUE_TEXT) -> List[Dict[str, str]]:
     """Scrape all tables on the page (both Gainers and Losers)"""
+    if use_js:
+        rows = _scrape_all_tables_via_js(driver, report)
+        # An empty result may just mean the tables are not rendered yet via
+        # this path; let Selenium have a go before reporting nothing.
+        if rows:
+            return rows
+        print("[info] JS extraction returned no rows, falling back to Selenium")
+        if metrics:
+            metrics.count("extract_fallbacks")
+    return _scrape_all_tables_via_selenium(driver, report)
+
+
+def _scrape_all_tables_via_selenium(driver: webdriver.Chrome, report: str = REPORT_VALUE_TEXT) -> List[Dict[str, str]]:
+    """Element-by-element extraction (one WebDriver call per cell)."""
     all_rows = []
-    
-    # Disable JS extraction - use Selenium directly to get both tables
-    # Try to get all tables via JavaScript first
-    # js_tables = _get_tables_via_js(driver) or []
-    # js_grids = _get_grid_via_js(driver) or []
-    # candidates = js_tables + js_grids
-    
-    # print(f"[debug] found {len(js_tables)} tables via JS, {len(js_grids)} grids")
-    
-    # if candidates:
-    #     # Filter tables that have company data
-    #     valid_tables = []
-    #     for idx, t in enumerate(candidates):
-    #         hs = [h.lower() for h in (t.get('headers') or [])]
-    #         rows_count = len(t.get('rows') or [])
-    #         print(f"[debug] table {idx}: {len(hs)} headers, {rows_count} rows, headers: {hs[:3]}")
-    #         if any(('company' in h) or ('volume' in h) or ('value traded' in h) for h in hs):
-    #             valid_tables.append(t)
-    #             print(f"[debug] table {idx} is VALID (has company data)")
-    #     
-    #     print(f"[debug] {len(valid_tables)} valid tables found")
-    #     
-    #     if not valid_tables:
-    #         print("[warn] no valid tables found via JS")
-    #         valid_tables = candidates[:2] if len(candidates) >= 2 else candidates
-    #     
-    #     # Process all valid tables
-    #     for table_idx, table_data in enumerate(valid_tables):
-    #         headers = table_data.get('headers') or []
-    #         rows_js = table_data.get('rows') or []
-    #         print(f"[debug] processing table {table_idx}: {len(rows_js)} rows")
-    #         
-    #         for r in rows_js:
-    #             while len(headers) < len(r):
-    #                 headers.append(f"Column {len(headers)+1}")
-    #             row = { (headers[i] if i < len(headers) else f"Column {i+1}"): (r[i] if i < len(r) else "") for i in range(len(r)) }
-    #             all_rows.append(row)
-    #     
-    #     print(f"[debug] total rows collected: {len(all_rows)}")
-    #     return all_rows
-    
-    # Use Selenium directly to get both tables
+
     try:
         tables = _get_all_tables(driver)
         print(f"[info] found {len(tables)} tables via Selenium")
-        
-        expected_headers = ["Company", "Symbol", "Open", "Highest", "Lowest", "Close", "Change", "Change %", "Volume Traded", "Value Traded"]
-        
-        import re
 
         for tbl in tables:
             try:
-                # Get headers
+                # Get headers (extra reports' column layout, see _build_row)
                 headers = []
                 try:
-                    ths = tbl.find_elements(By.XPATH, ".//thead//th")
-                    headers = [th.text.strip() for th in ths if th.text.strip()]
+                    ths = tbl.find_elements(By.XPATH, ".//thead//th") or tbl.find_elements(By.XPATH, "(.//tr)[1]/th")
+                    headers = _report_headers(report, [th.text.strip() for th in ths])
                 except Exception:
                     pass
                 
-                # Use expected headers if needed (inject Symbol)
-                if True: # Force expected structure as we are injecting Symbol
-                    headers = expected_headers
-                
                 # Get rows
                 trs = tbl.find_elements(By.XPATH, ".//tbody/tr")
                 if not trs:
@@ -629,26 +1371,7 @@ def scrape_all_tables(driver: webdriver.Chrome) -> List[Dict[str, str]]:
                     except Exception:
                         pass
 
-                    # Our headers has "Symbol" at index 1. The original table does NOT have it.
-                    # Original columns match expected_headers indices 0, 2, 3...
-                    # We manually construct the row.
-                    
-                    row = {}
-                    row["Company"] = tds[0].text.strip()
-                    row["Symbol"] = symbol
-                    
-                    # Map remaining columns (skip Company which is index 0)
-                    # We expect 8 value columns: Open, Highest, Lowest, Close, Change, Change %, Volume, Value
-                    # tds[1] -> Open, etc.
-                    val_headers = expected_headers[2:] # Open to Value Traded
-                    
-                    for i, h in enumerate(val_headers):
-                        if i + 1 < len(tds):
-                            row[h] = tds[i+1].text.strip()
-                        else:
-                            row[h] = ""
-                    
-                    all_rows.append(row)
+                    all_rows.append(_build_row([td.text.strip() for td in tds], symbol, headers))
             except Exception as e:
                 print(f"[warn] error processing table: {e}")
                 continue
@@ -664,6 +1387,568 @@ def scrape_table(driver: webdriver.Chrome) -> List[Dict[str, str]]:
     return scrape_all_tables(driver)
 
 
+def compare_extraction_timing(driver: webdriver.Chrome) -> Dict[str, float]:
+    """Time the JS and Selenium extraction paths on the current page and check they agree."""
+    t0 = time.perf_counter()
+    js_rows = _scrape_all_tables_via_js(driver) or []
+    t_js = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    se_rows = _scrape_all_tables_via_selenium(driver)
+    t_se = time.perf_counter() - t0
+    same = js_rows == se_rows
+    speedup = (t_se / t_js) if t_js > 0 else float("inf")
+    print(
+        f"[bench] extraction: js={t_js:.3f}s ({len(js_rows)} rows) "
+        f"selenium={t_se:.3f}s ({len(se_rows)} rows) speedup={speedup:.1f}x identical={same}"
+    )
+    if not same:
+        for i, (a, b) in enumerate(zip(js_rows, se_rows)):
+            if a != b:
+                print(f"[bench] first mismatch at row {i}: js={a} selenium={b}")
+                break
+    return {"js_seconds": t_js, "selenium_seconds": t_se, "js_rows": len(js_rows), "selenium_rows": len(se_rows), "identical": same}
+
+
+def benchmark_extraction(headless: bool = True) -> Dict[str, Dict[str, float]]:
+    """Run the JS vs Selenium extraction comparison for every period."""
+    driver = build_driver(headless=headless)
+    try:
+        wait = open_target(driver)
+        select_and_wait(driver, wait, lambda: select_report(driver, wait))
+        timings = {}
+        for p in PERIODS:
+            select_and_wait(driver, wait, lambda: select_period(driver, wait, p))
+            print(f"[bench] period: {p}")
+            timings[p] = compare_extraction_timing(driver)
+        total_js = sum(t["js_seconds"] for t in timings.values())
+        total_se = sum(t["selenium_seconds"] for t in timings.values())
+        print(f"[bench] total extraction: js={total_js:.3f}s selenium={total_se:.3f}s")
+        return timings
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Browser-free HTTP backend
+#
+# The market performance portlet is a server-rendered form: the page carries
+# the Report/Period <select>s and the marketPerformanceTable* tables, and
+# changing a dropdown submits the form back to the portlet. The HTTP backend
+# replays that submission with a pooled requests session and parses whatever
+# comes back (HTML tables or a JSON payload) into the same row dicts the
+# Selenium path produces.
+# ---------------------------------------------------------------------------
+
+HTTP_TIMEOUT = 30
+HTTP_REPORT_FIELDS = ["reportList", "reportFilter"]
+HTTP_PERIOD_FIELDS = ["periodList", "periodFilter", "period", "timeFrameFilter"]
+REPORT_VALUE = REPORTS[REPORT_VALUE_TEXT]["value"]
+
+# JSON payload keys (lower-cased, punctuation stripped) -> scraper column
+_JSON_FIELD_MAP = {
+    "company": "Company", "companyname": "Company", "name": "Company", "shortname": "Company",
+    "symbol": "Symbol", "companysymbol": "Symbol", "code": "Symbol",
+    "open": "Open", "openprice": "Open",
+    "highest": "Highest", "high": "Highest", "highprice": "Highest",
+    "lowest": "Lowest", "low": "Lowest", "lowprice": "Lowest",
+    "close": "Close", "closeprice": "Close", "lasttradeprice": "Close",
+    "change": "Change", "netchange": "Change",
+    "changepercent": "Change %", "change%": "Change %", "percentchange": "Change %", "changepct": "Change %",
+    "volumetraded": "Volume Traded", "volume": "Volume Traded",
+    "valuetraded": "Value Traded", "value": "Value Traded", "turnover": "Value Traded",
+}
+
+
+_CSS_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+_CSS_HIDES = re.compile(r"display\s*:\s*none|visibility\s*:\s*hidden", re.I)
+
+
+def _css_hidden_selectors(css: str) -> Tuple[set, set]:
+    """Ids and classes that plain ``#id`` / ``.class`` rules in ``css`` hide.
+
+    Compound selectors are not evaluated; tables hidden that way (or by an
+    external stylesheet) are caught by checking the HTTP output against
+    Selenium before it is trusted (see ``_http_trusted``).
+    """
+    ids, classes = set(), set()
+    for selectors, body in _CSS_RULE.findall(re.sub(r"/\*.*?\*/", "", css, flags=re.S)):
+        if not _CSS_HIDES.search(body):
+            continue
+        for sel in selectors.split(","):
+            m = re.fullmatch(r"(?:table)?([#.])([\w-]+)", sel.strip())
+            if m:
+                (ids if m.group(1) == "#" else classes).add(m.group(2))
+    return ids, classes
+
+
+class _PortletHTMLParser(HTMLParser):
+    """Collects forms (with their selects/hidden inputs), the market tables and the page's CSS."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []
+        self.tables = {}
+        self.styles = []
+        self.stylesheets = []
+        self._style = None
+        self._form = None
+        self._select = None
+        self._option = None
+        self._table = None
+        self._row = None
+        self._cell = None
+        self._table_depth = 0
+
+    @staticmethod
+    def _hidden(attrs: Dict[str, str]) -> bool:
+        style = (attrs.get("style") or "").replace(" ", "").lower()
+        classes = (attrs.get("class") or "").lower().split()
+        return "hidden" in attrs or "display:none" in style or "visibility:hidden" in style or \
+            any(c in ("d-none", "hide", "hidden") for c in classes)
+
+    def is_visible(self, table: Dict) -> bool:
+        """Inline hiding, or a ``<style>`` rule on the table's id or one of its classes."""
+        hidden_ids, hidden_classes = _css_hidden_selectors("\n".join(self.styles))
+        return not table["inline_hidden"] and table["id"] not in hidden_ids and \
+            not hidden_classes.intersection(table["classes"])
+
+    def handle_starttag(self, tag, attrs):
+        a = {k: (v if v is not None else "") for k, v in attrs}
+        if tag == "style":
+            self._style = []
+        elif tag == "link" and "stylesheet" in (a.get("rel") or "").lower().split():
+            self.stylesheets.append(a.get("href", ""))
+        elif tag == "form":
+            self._form = {"action": a.get("action", ""), "method": (a.get("method") or "get").lower(),
+                          "fields": {}, "selects": {}}
+            self.forms.append(self._form)
+        elif tag == "input" and self._form is not None and a.get("name"):
+            if (a.get("type") or "").lower() in ("hidden", "text", ""):
+                self._form["fields"][a["name"]] = a.get("value", "")
+        elif tag == "select":
+            self._select = {"name": a.get("name", ""), "id": a.get("id", ""), "options": []}
+            if self._form is not None:
+                self._form["selects"][self._select["name"] or self._select["id"]] = self._select
+        elif tag == "option" and self._select is not None:
+            self._option = {"value": a.get("value"), "text": "", "selected": "selected" in a}
+            self._select["options"].append(self._option)
+        elif tag == "table":
+            if self._table is not None:
+                self._table_depth += 1
+            elif a.get("id") in MARKET_TABLE_IDS:
+                self._table = {"id": a["id"], "inline_hidden": self._hidden(a),
+                               "classes": (a.get("class") or "").split(), "headers": [], "rows": []}
+                self.tables[a["id"]] = self._table
+        elif self._table is not None and self._table_depth == 0:
+            if tag == "tr":
+                self._row = {"cells": [], "heads": [], "href": None}
+            elif tag in ("td", "th") and self._row is not None:
+                self._cell = []
+            elif tag == "a" and self._cell is not None and not self._row["cells"] and self._row["href"] is None:
+                self._row["href"] = a.get("href", "")
+            elif tag == "br" and self._cell is not None:
+                self._cell.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "style" and self._style is not None:
+            self.styles.append("".join(self._style))
+            self._style = None
+        elif tag == "form":
+            self._form = None
+        elif tag == "select":
+            self._select = None
+        elif tag == "option":
+            if self._option is not None:
+                self._option["text"] = self._option["text"].strip()
+                if self._option["value"] is None:
+                    self._option["value"] = self._option["text"]
+            self._option = None
+        elif tag == "table" and self._table is not None:
+            if self._table_depth:
+                self._table_depth -= 1
+            else:
+                self._table = None
+        elif self._table is not None and self._table_depth == 0:
+            if tag in ("td", "th") and self._cell is not None:
+                self._row["cells" if tag == "td" else "heads"].append(" ".join("".join(self._cell).split()))
+                self._cell = None
+            elif tag == "tr" and self._row is not None:
+                if self._row["cells"]:
+                    self._table["rows"].append(self._row)
+                elif self._row["heads"] and not self._table["headers"]:
+                    self._table["headers"] = self._row["heads"]
+                self._row = None
+
+    def handle_data(self, data):
+        if self._style is not None:
+            self._style.append(data)
+        if self._option is not None:
+            self._option["text"] += data
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def _symbol_from(href: Optional[str], first_cell: str) -> str:
+    m = re.search(r'/(\d{4})', href or "")
+    if m:
+        return m.group(1)
+    m = re.search(r'(\d{4})', first_cell)
+    return m.group(1) if m else ""
+
+
+def parse_market_tables_html(html: str, report: str = REPORT_VALUE_TEXT) -> List[Dict[str, str]]:
+    """Parse the visible marketPerformanceTable* tables of ``report`` out of portlet HTML."""
+    parser = _PortletHTMLParser()
+    parser.feed(html)
+    rows = []
+    for table_id in MARKET_TABLE_IDS:
+        t = parser.tables.get(table_id)
+        if not t:
+            continue
+        if not parser.is_visible(t):
+            print(f"[debug] found hidden table by ID: {table_id} - skipping")
+            continue
+        for r in t["rows"]:
+            rows.append(_build_row(r["cells"], _symbol_from(r["href"], r["cells"][0]),
+                                   _report_headers(report, t["headers"])))
+    return rows
+
+
+def parse_market_json(payload) -> List[Dict[str, str]]:
+    """Map a JSON list of records (or a dict wrapping one) onto scraper rows."""
+    records = payload
+    if isinstance(payload, dict):
+        records = next((v for v in payload.values() if isinstance(v, list)), [])
+    rows = []
+    for rec in records or []:
+        if not isinstance(rec, dict):
+            continue
+        row = {h: "" for h in EXPECTED_HEADERS}
+        for k, v in rec.items():
+            col = _JSON_FIELD_MAP.get(re.sub(r"[\s_\-]", "", str(k)).lower())
+            if col and not row[col]:
+                row[col] = "" if v is None else str(v).strip()
+        if row["Company"]:
+            rows.append(row)
+    return rows
+
+
+def build_http_session(pool_size: int = 4) -> "requests.Session":
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Safari/537.36"
+        ),
+        "Accept": "text/html,application/json;q=0.9,*/*;q=0.8",
+    })
+    return session
+
+
+def _pick_option(select: Dict, texts: List[str], value: Optional[str] = None, keywords: Optional[List[str]] = None) -> Optional[str]:
+    opts = select["options"]
+    if value:
+        for o in opts:
+            if o["value"] == value:
+                return o["value"]
+    for t in texts:
+        for o in opts:
+            if o["text"].lower() == t.lower():
+                return o["value"]
+    if keywords:
+        for o in opts:
+            if all(k.lower() in o["text"].lower() for k in keywords):
+                return o["value"]
+    for t in texts:
+        for o in opts:
+            if t.lower() in o["text"].lower():
+                return o["value"]
+    return None
+
+
+def _find_portlet_form(forms: List[Dict]) -> Optional[Tuple[Dict, str, str]]:
+    for form in forms:
+        report_key = next((k for k in HTTP_REPORT_FIELDS if k in form["selects"]), None)
+        period_key = next((k for k in HTTP_PERIOD_FIELDS if k in form["selects"]), None)
+        if report_key and period_key:
+            return form, report_key, period_key
+    return None
+
+
+def _parse_response(resp, report: str = REPORT_VALUE_TEXT) -> List[Dict[str, str]]:
+    ctype = resp.headers.get("Content-Type", "").lower()
+    if "json" in ctype:
+        return parse_market_json(resp.json())
+    text = resp.text
+    if text.lstrip()[:1] in ("[", "{"):
+        try:
+            return parse_market_json(json.loads(text))
+        except ValueError:
+            pass
+    return parse_market_tables_html(text, report)
+
+
+def fetch_results_http(url: str = TARGET_URL, periods: Optional[List[str]] = None,
+                       session: Optional["requests.Session"] = None,
+                       report: str = REPORT_VALUE_TEXT,
+                       meta_out: Optional[Dict] = None, page: Optional[Tuple[str, str]] = None,
+                       prefetched: Optional[Dict[str, List[Dict[str, str]]]] = None,
+                       accept_layout=None) -> Optional[Dict[str, List[Dict[str, str]]]]:
+    """Fetch every period of ``report`` over plain HTTP.
+
+    Returns None when the portlet form cannot be found or the responses do
+    not look like per-period data, so the caller can fall back to Selenium.
+    ``meta_out`` receives the page's layout ``signature`` (see
+    ``_portlet_signature``) and the ``page`` itself as ``(url, html)`` once
+    it has been parsed. Passing that ``page`` back skips the page request,
+    and periods in ``prefetched`` (rows fetched earlier on the same page)
+    are not requested again. ``accept_layout(signature)`` returning False
+    stops before any form is replayed.
+    """
+    if not REQUESTS_AVAILABLE:
+        print("[warn] requests not available, HTTP backend disabled")
+        return None
+    periods = periods or PERIODS
+    own_session = session is None
+    session = session or build_http_session()
+    try:
+        if page is None:
+            print("[http] fetching portlet page")
+            resp = session.get(url, timeout=HTTP_TIMEOUT)
+            resp.raise_for_status()
+            page = (resp.url, resp.text)
+        page_url, page_html = page
+        parser = _PortletHTMLParser()
+        parser.feed(page_html)
+        signature = _portlet_signature(parser)
+        if meta_out is not None:
+            meta_out["signature"] = signature
+            meta_out["page"] = page
+        if accept_layout is not None and not accept_layout(signature):
+            print("[http] page layout recently failed validation against Selenium, not replaying the form")
+            return None
+        found = _find_portlet_form(parser.forms)
+        if not found:
+            print("[warn] [http] report/period form not found in portlet page")
+            return None
+        form, report_key, period_key = found
+        report_select = form["selects"][report_key]
+        spec = REPORTS.get(report)
+        if spec is None:
+            i = _match_option([(o["text"], o["value"]) for o in report_select["options"]], report)
+            report_value = None if i is None else report_select["options"][i]["value"]
+        else:
+            report_value = _pick_option(report_select, [report], value=spec.get("value"), keywords=spec.get("keywords"))
+        if report_value is None:
+            print(f"[warn] [http] report option not found: {report}")
+            return None
+        action = urljoin(page_url, form["action"] or page_url)
+        results = {}
+        for p in periods:
+            if prefetched and p in prefetched:
+                results[p] = prefetched[p]
+                continue
+            period_value = _pick_option(form["selects"][period_key], _period_variants(p))
+            if period_value is None:
+                print(f"[warn] [http] period option not found: {p}")
+                return None
+            data = dict(form["fields"])
+            data[report_key] = report_value
+            data[period_key] = period_value
+            print(f"[http] period: {p}")
+            if form["method"] == "post":
+                r = session.post(action, data=data, timeout=HTTP_TIMEOUT)
+            else:
+                r = session.get(action, params=data, timeout=HTTP_TIMEOUT)
+            r.raise_for_status()
+            rows = _parse_response(r, report)
+            print(f"[data] rows fetched: {len(rows)} for {p}")
+            results[p] = rows
+        if not all(results.values()):
+            print("[warn] [http] at least one period returned no rows")
+            return None
+        if len(periods) > 1 and all(v == results[periods[0]] for v in results.values()):
+            # The server ignored the period parameter; the data is not trustworthy.
+            print("[warn] [http] all periods returned identical data")
+            return None
+        return results
+    except Exception as e:
+        print(f"[warn] [http] fetch failed: {e}")
+        return None
+    finally:
+        if own_session:
+            session.close()
+
+
+# The HTTP backend replays the portlet form with field names taken from the
+# page and parses tables whose visibility it can only partly judge without a
+# browser. Its output is therefore only trusted for a page layout it has
+# already reproduced exactly: an auto run on an unknown layout scrapes with
+# Selenium and records the layout as validated when both outputs match.
+HTTP_VALIDATION_PATH = ".scraper_http_validation.json"
+# A layout whose HTTP output did not match is not replayed again for this
+# long: auto runs go straight to Selenium instead of paying for both.
+HTTP_REVALIDATE_DAYS = 7
+
+
+def _portlet_signature(parser: _PortletHTMLParser) -> str:
+    """Digest of the page layout the HTTP parse depends on (form, tables, CSS), not of the data."""
+    return digest_json({
+        "forms": [{"method": f["method"], "fields": sorted(f["fields"]),
+                   "selects": {k: [o["value"] for o in sel["options"]] for k, sel in f["selects"].items()}}
+                  for f in parser.forms],
+        "tables": {t["id"]: [t["inline_hidden"], t["classes"], t["headers"]] for t in parser.tables.values()},
+        "styles": parser.styles,
+        "stylesheets": parser.stylesheets,
+    })
+
+
+def _normalized_rows(rows: List[Dict[str, str]]) -> List[Tuple[Tuple[str, str], ...]]:
+    """Rows as sorted ``(column, whitespace-collapsed value)`` tuples without empty columns, for comparing backends."""
+    return sorted(tuple(sorted((k, " ".join(str(v).split())) for k, v in r.items() if v not in ("", None)))
+                  for r in rows)
+
+
+def _load_json_dict(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _http_trusted(signature: Optional[str], reports: List[str], path: str = HTTP_VALIDATION_PATH) -> bool:
+    """True when every report in ``reports`` matched Selenium on a page with this layout."""
+    record = _load_json_dict(path)
+    return bool(signature) and record.get("signature") == signature and \
+        set(reports) <= set(record.get("reports", []))
+
+
+def _http_rejected(signature: Optional[str], path: str = HTTP_VALIDATION_PATH,
+                   days: float = HTTP_REVALIDATE_DAYS) -> bool:
+    """True when this layout's HTTP output failed to match Selenium within the last ``days``."""
+    record = _load_json_dict(path)
+    if not signature or record.get("rejected") != signature:
+        return False
+    try:
+        rejected_at = time.mktime(time.strptime(record.get("rejected_at", ""), "%Y-%m-%dT%H:%M:%S"))
+    except (TypeError, ValueError, OverflowError):
+        return False
+    return time.time() - rejected_at < days * 86400
+
+
+def validate_http_results(http_reports: Dict[str, Dict[str, List[Dict[str, str]]]], signature: Optional[str],
+                          selenium_reports: Dict[str, Dict[str, List[Dict[str, str]]]],
+                          path: str = HTTP_VALIDATION_PATH) -> Dict[str, bool]:
+    """Compare HTTP and Selenium output per report and record the layout if the primary report matches.
+
+    A report matches when every period is present in both and the
+    normalized rows are equal (rows marked ``Stale`` never match). On a
+    mismatch of the primary report the layout is recorded as rejected
+    instead (see _http_rejected).
+    Returns ``{report: matched}``.
+    """
+    matched = {}
+    for report, http_periods in http_reports.items():
+        sel_periods = selenium_reports.get(report) or {}
+        ok = bool(http_periods) and set(http_periods) == set(sel_periods)
+        for p in sorted(http_periods) if ok else []:
+            if any("Stale" in r for r in sel_periods[p]) or \
+                    _normalized_rows(http_periods[p]) != _normalized_rows(sel_periods[p]):
+                print(f"[http] {report} / {p}: HTTP rows ({len(http_periods[p])}) differ from "
+                      f"Selenium rows ({len(sel_periods[p])})")
+                ok = False
+                break
+        matched[report] = ok
+    if signature and matched.get(REPORT_VALUE_TEXT):
+        record = {"signature": signature, "reports": sorted(r for r, ok in matched.items() if ok),
+                  "validated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    elif signature:
+        record = {"rejected": signature, "rejected_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    else:
+        record = {}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[warn] could not write HTTP validation: {e}")
+    summary = ", ".join(f"{r}={'match' if ok else 'mismatch'}" for r, ok in matched.items())
+    print(f"[http] validation against Selenium: {summary}")
+    return matched
+
+
+PROBE_PERIOD = "3 Months"
+PROBE_FALLBACKS = ("run", "skip")
+# Digest of the probe period as the HTTP backend parsed it on the last
+# completed run; the probe only ever compares like with like.
+PROBE_STATE_PATH = ".scraper_probe_state.json"
+
+
+def _probe_digest(rows: List[Dict[str, str]]) -> str:
+    return digest_json([[list(c) for c in r] for r in _normalized_rows(rows)])
+
+
+def probe_freshness(url: str = TARGET_URL, state_path: str = PROBE_STATE_PATH,
+                    period: str = PROBE_PERIOD, session: Optional["requests.Session"] = None,
+                    state_out: Optional[Dict] = None, fetch_out: Optional[Dict] = None,
+                    validation_path: str = HTTP_VALIDATION_PATH) -> str:
+    """Check over plain HTTP whether the portal has new data, before any browser starts.
+
+    Fetches a single period and compares its normalized digest with the
+    one the probe recorded for the last completed run on the same page
+    layout. Every period is priced off the latest close, so one unchanged
+    period means the whole report is unchanged. Returns ``"unchanged"``,
+    ``"changed"`` or ``"unknown"`` (probe failed, or the HTTP parse of this
+    layout has not matched Selenium yet, so it cannot vouch for anything).
+
+    The new digest is put in ``state_out``; the caller stores it with
+    save_probe_state() once the run's results are saved, so a failed run
+    is probed as changed again next time. ``fetch_out`` receives the
+    fetched ``page`` and ``rows`` for reuse by the HTTP backend, and
+    whether the layout was ``validated``.
+    """
+    meta = {}
+    fetched = fetch_results_http(url, [period], session=session, meta_out=meta)
+    if fetched is None:
+        return "unknown"
+    signature = meta.get("signature")
+    state = {"period": period, "signature": signature, "digest": _probe_digest(fetched[period])}
+    if state_out is not None:
+        state_out.update(state)
+    validated = _http_trusted(signature, [REPORT_VALUE_TEXT], validation_path)
+    if fetch_out is not None:
+        fetch_out.update(page=meta.get("page"), rows=fetched, validated=validated)
+    if not validated:
+        print("[probe] HTTP output not validated against Selenium for this page layout, probe inconclusive")
+        return "unknown"
+    previous = _load_json_dict(state_path)
+    if previous.get("period") != period or previous.get("signature") != signature or not previous.get("digest"):
+        print(f"[probe] no previous probe of {period} on this page layout, treating as changed")
+        return "changed"
+    return "unchanged" if previous["digest"] == state["digest"] else "changed"
+
+
+def save_probe_state(state: Dict, path: str = PROBE_STATE_PATH) -> None:
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(dict(state, probed_at=time.strftime("%Y-%m-%dT%H:%M:%S")), f, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[warn] could not write probe state: {e}")
+
+
 def save_results_json(results: Dict[str, List[Dict[str, str]]], path: str) -> None:
     with open(path, "w", encoding="utf-8") as f:
         json.dump(results, f, ensure_ascii=False, indent=2)
@@ -692,30 +1977,17 @@ def save_results_csv(results: Dict[str, List[Dict[str, str]]], path: str) -> Non
                 w.writerow(row)
 
 
-def calculate_rs_metrics(results: Dict[str, List[Dict[str, str]]], output_path: str) -> None:
-    # Flatten data for DataFrame
-    data = []
-    for period, rows in results.items():
-        for r in rows:
-            # Clean Change %: remove '%' and convert to float
-            try:
-                change_pct_str = r.get("Change %", "").replace("%", "").strip()
-                change_pct = float(change_pct_str) if change_pct_str else None
-            except ValueError:
-                change_pct = None
-                
-            data.append({
-                "Company": r.get("Company", ""),
-                "Symbol": r.get("Symbol", ""),
-                "period": period,
-                "Change %": change_pct
-            })
-    
-    if not data:
+def calculate_rs_metrics(results: Dict[str, List[Dict[str, str]]], output_path: str,
+                         frame: Optional["pd.DataFrame"] = None) -> None:
+    # Typed frame (Change % already numeric); built here when the caller has none
+    df = frame if frame is not None else to_typed_frame(results)
+    if df.empty:
         print("[warn] no data to analyze")
         return
+    for period, since in stale_periods(df).items():
+        print(f"[warn] period '{period}' is stale: RS uses cached data scraped {since}")
 
-    df = pd.DataFrame(data)
+    df = df[["Company", "Symbol", "period", "Change %"]]
     
     # Pivot: Company and Symbol as index
     # We want columns like: "Change %_1 Year", "Change %_9 Months", etc.
@@ -732,13 +2004,13 @@ def calculate_rs_metrics(results: Dict[str, List[Dict[str, str]]], output_path:
     
     # Calculate RS for each period
     # Formula: MIN(ROUND(PERCENTRANK.INC(AC:AC,AC6)*100,0),99)
-    # Pandas rank(pct=True) gives 0.0 to 1.0. We multiply by 100.
+    # percentile_rating: rank(pct=True) * 100, rounded, capped at 99 (see rs_ranking).
     rs_cols = []
     for p, weight in period_map.items():
         if p in df_pivot.columns:
             col_name = f"RS_{p.replace(' ', '')}"
             # Refined logic to match user formula: MIN(ROUND(..., 0), 99)
-            df_pivot[col_name] = (df_pivot[p].rank(pct=True) * 100).round(0).clip(upper=99)
+            df_pivot[col_name] = percentile_rating(df_pivot[p].to_numpy(dtype=float))
             rs_cols.append((col_name, weight))
         else:
             print(f"[warn] period '{p}' not found in data")
@@ -784,31 +2056,131 @@ def calculate_rs_metrics(results: Dict[str, List[Dict[str, str]]], output_path:
         print(f"[warn] could not save Excel file: {e}")
 
 
-def run(headless: bool = True) -> Dict[str, List[Dict[str, str]]]:
-    driver = build_driver(headless=headless)
-    try:
-        wait = open_target(driver)
-        prev_before_report = _first_cell_text(driver)
-        select_report(driver, wait)
-        wait_for_table_update(driver, wait, prev_before_report)
-        results = {}
-        for p in PERIODS:
-            prev = _first_cell_text(driver)
-            select_period(driver, wait, p)
-            wait_for_table_update(driver, wait, prev)
-            data = scrape_table(driver)
-            print(f"[data] rows scraped: {len(data)} for {p}")
-            results[p] = data
-        print("[save] writing JSON/CSV files")
-        save_results_json(results, "saudiexchange_results.json")
-        save_results_csv(results, "saudiexchange_results.csv")
-        
-        if PANDAS_AVAILABLE:
-            print("[analysis] calculating RS metrics")
-            calculate_rs_metrics(results, "saudiexchange_rs_analysis.csv")
-        else:
-            print("[warn] pandas not available, skipping RS analysis")
+# Local state like the other .scraper_* files (kept in the CI cache, not in
+# git, where it would duplicate every scraped row each day)
+PERIOD_CACHE_PATH = ".scraper_period_cache.json"
+PERIOD_RETRIES = 2
 
+
+def _load_period_cache(path: str = PERIOD_CACHE_PATH) -> Dict[str, Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _update_period_cache(results: Dict[str, List[Dict[str, str]]], path: str = PERIOD_CACHE_PATH) -> None:
+    """Store freshly scraped periods as the last good data; stale periods are left untouched.
+
+    Only periods whose rows differ from the cached ones are rewritten, so a
+    scrape that brings nothing new leaves the file as it is and
+    ``scraped_at`` is when the cached rows were first seen.
+    """
+    fresh = {p: rows for p, rows in results.items() if rows and not any("Stale" in r for r in rows)}
+    cache = _load_period_cache(path)
+    changed = {p: rows for p, rows in fresh.items() if cache.get(p, {}).get("rows") != rows}
+    if not changed:
+        return
+    scraped_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for p, rows in changed.items():
+        cache[p] = {"scraped_at": scraped_at, "rows": rows}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"[warn] could not write period cache: {e}")
+
+
+def _select_other_period(driver: webdriver.Chrome, wait: WebDriverWait, period: str,
+                         metrics: RunMetrics, **labels) -> None:
+    """Move the Period dropdown off ``period`` so selecting it again really reloads the table."""
+    other = next((q for q in PERIODS if q != period), None)
+    if other is None:
+        return
+    try:
+        select_and_wait(driver, wait, lambda: select_period(driver, wait, other), metrics, "select_period",
+                        period=other, **labels)
+    except Exception as e:
+        print(f"[warn] could not switch away from {period}: {e}")
+
+
+def scrape_periods(driver: webdriver.Chrome, wait: WebDriverWait, periods: List[str],
+                   metrics: Optional[RunMetrics] = None, retries: int = PERIOD_RETRIES,
+                   report: Optional[str] = None) -> Dict[str, List[Dict[str, str]]]:
+    """Select each period in turn on an already-opened page and scrape it.
+
+    A period whose table comes back empty, or unchanged from the previous
+    period, is retried up to ``retries`` times; each retry first selects a
+    different period, since re-selecting the current one is a no-op for the
+    page. Periods that still fail are
+    left out of the result instead of aborting the session. ``report``
+    labels the metrics and picks the column layout; the caller has already
+    selected it.
+    """
+    metrics = metrics or RunMetrics()
+    extra = {"report": report} if report else {}
+    results = {}
+    last_rows = None
+    for p in periods:
+        data = None
+        for attempt in range(retries + 1):
+            if attempt:
+                print(f"[retry] period {p}, attempt {attempt + 1}/{retries + 1}")
+                metrics.count("period_retries")
+                _select_other_period(driver, wait, p, metrics, **extra)
+            try:
+                select_and_wait(driver, wait, lambda: select_period(driver, wait, p), metrics, "select_period",
+                                period=p, **extra)
+                with metrics.phase("extract", period=p, **extra):
+                    data = scrape_all_tables(driver, metrics=metrics, report=report or REPORT_VALUE_TEXT)
+            except Exception as e:
+                print(f"[warn] period {p} failed: {e}")
+                data = None
+            if data and data != last_rows:
+                break
+            if data is not None:
+                print(f"[warn] period {p}: {'no rows' if not data else 'table did not change'}")
+            data = None
+        if data is None:
+            metrics.count("period_failures")
+            continue
+        print(f"[data] rows scraped: {len(data)} for {p}")
+        metrics.rows(f"{report}: {p}" if report else p, len(data))
+        results[p] = data
+        last_rows = data
+    return results
+
+
+def _scrape_session(periods: List[str], headless: bool = True, lean: bool = False,
+                    metrics: Optional[RunMetrics] = None, extra_reports: Optional[List[str]] = None,
+                    extra_out: Optional[Dict[str, Dict[str, List[Dict[str, str]]]]] = None) -> Dict[str, List[Dict[str, str]]]:
+    """Open a fresh browser session, select the report and scrape the given periods.
+
+    ``extra_reports`` are scraped afterwards on the same page (same frame,
+    no new navigation) and stored into ``extra_out[report][period]``.
+    Returns the primary report's periods.
+    """
+    metrics = metrics or RunMetrics()
+    with metrics.phase("driver_startup"):
+        driver = build_driver(headless=headless, lean=lean)
+    try:
+        wait = open_target(driver, metrics=metrics)
+        select_and_wait(driver, wait, lambda: select_report(driver, wait), metrics, "select_report")
+        results = scrape_periods(driver, wait, periods, metrics)
+        for report in extra_reports or []:
+            try:
+                select_and_wait(driver, wait, lambda: select_report(driver, wait, report), metrics, "select_report",
+                                report=report)
+                rows = scrape_periods(driver, wait, periods, metrics, report=report)
+            except Exception as e:
+                print(f"[warn] report {report} failed: {e}")
+                continue
+            if extra_out is not None:
+                extra_out.setdefault(report, {}).update(rows)
         return results
     finally:
         try:
@@ -817,10 +2189,332 @@ def run(headless: bool = True) -> Dict[str, List[Dict[str, str]]]:
             pass
 
 
+def _split_periods(periods: List[str], workers: int) -> List[List[str]]:
+    workers = max(1, min(workers, len(periods)))
+    return [periods[i::workers] for i in range(workers)]
+
+
+def scrape_parallel(periods: List[str], workers: int, headless: bool = True, lean: bool = False,
+                    metrics: Optional[RunMetrics] = None, extra_reports: Optional[List[str]] = None,
+                    extra_out: Optional[Dict[str, Dict[str, List[Dict[str, str]]]]] = None) -> Dict[str, List[Dict[str, str]]]:
+    """Scrape periods on a pool of independent browser sessions.
+
+    Each worker owns its own driver and scrapes its share of the periods
+    (for the primary report and any ``extra_reports``).
+    Periods whose worker failed are retried once in a single serial session,
+    extra reports included.
+    Results are returned in the order of ``periods``.
+    """
+    metrics = metrics or RunMetrics()
+    chunks = _split_periods(periods, workers)
+    print(f"[parallel] scraping {len(periods)} periods with {len(chunks)} workers")
+    merged = {}
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = {pool.submit(_scrape_session, chunk, headless, lean, metrics, extra_reports, extra_out): chunk
+                   for chunk in chunks}
+        for fut in as_completed(futures):
+            chunk = futures[fut]
+            try:
+                merged.update(fut.result())
+                print(f"[parallel] worker done: {', '.join(chunk)}")
+            except Exception as e:
+                print(f"[warn] worker for {', '.join(chunk)} failed: {e}")
+    missing = [p for p in periods if p not in merged]
+    if missing:
+        print(f"[parallel] retrying failed periods serially: {', '.join(missing)}")
+        metrics.count("worker_retries", len(missing))
+        try:
+            merged.update(_scrape_session(missing, headless, lean, metrics, extra_reports, extra_out))
+        except Exception as e:
+            print(f"[warn] serial retry failed: {e}")
+    return {p: merged[p] for p in periods if p in merged}
+
+
+def scrape_with_fallback(periods: List[str], workers: int = 1, headless: bool = True, lean: bool = False,
+                         metrics: Optional[RunMetrics] = None, extra_reports: Optional[List[str]] = None,
+                         extra_out: Optional[Dict[str, Dict[str, List[Dict[str, str]]]]] = None) -> Dict[str, List[Dict[str, str]]]:
+    """Scrape ``periods``, re-trying failures in a fresh session and then falling back to cache.
+
+    Periods that could not be scraped at all are filled from the period
+    cache with every row marked ``Stale`` (the time the cached rows were
+    scraped). The per-period freshness, the stale periods' timestamps and
+    the stale row count are recorded in the run metrics.
+    Raises when no period could be scraped. ``extra_reports`` ride along
+    with their periods, retries included; they get no cache fallback.
+    """
+    metrics = metrics or RunMetrics()
+    if workers > 1:
+        # scrape_parallel already retries failed periods in a fresh session
+        results = scrape_parallel(periods, workers, headless=headless, lean=lean, metrics=metrics,
+                                  extra_reports=extra_reports, extra_out=extra_out)
+    else:
+        results = {}
+        for attempt in range(2):
+            missing = [p for p in periods if p not in results]
+            if not missing:
+                break
+            if attempt:
+                print(f"[retry] fresh session for: {', '.join(missing)}")
+                metrics.count("session_retries")
+            try:
+                results.update(_scrape_session(missing, headless=headless, lean=lean, metrics=metrics,
+                                               extra_reports=extra_reports, extra_out=extra_out))
+            except Exception as e:
+                print(f"[warn] scrape session failed: {e}")
+    if not results:
+        raise RuntimeError("no period could be scraped")
+    _update_period_cache(results)
+
+    cache = _load_period_cache()
+    freshness = {}
+    stale_since = {}
+    out = {}
+    for p in periods:
+        if p in results:
+            out[p] = results[p]
+            freshness[p] = "fresh"
+        elif cache.get(p, {}).get("rows"):
+            scraped_at = cache[p].get("scraped_at", "")
+            print(f"[warn] using last good data for {p} (scraped {scraped_at}), marked stale")
+            out[p] = [dict(r, Stale=scraped_at) for r in cache[p]["rows"]]
+            freshness[p] = "stale"
+            stale_since[p] = scraped_at
+            metrics.count("stale_periods")
+            metrics.count("stale_rows", len(out[p]))
+        else:
+            print(f"[error] no data and no cached data for {p}")
+            freshness[p] = "missing"
+    metrics.meta["freshness"] = freshness
+    if stale_since:
+        metrics.meta["stale_since"] = stale_since
+    return out
+
+
+REPORTS_RESULTS_PATH = "saudiexchange_reports.json"
+
+
+def save_results(results: Dict[str, List[Dict[str, str]]], metrics: Optional[RunMetrics] = None,
+                 reports: Optional[Dict[str, Dict[str, List[Dict[str, str]]]]] = None) -> None:
+    """Write the primary report's files and, when given, the combined ``{report: {period: rows}}`` file."""
+    metrics = metrics or RunMetrics()
+    inputs = {"scraped_results": digest_json(results)}
+    if reports:
+        inputs["scraped_reports"] = digest_json(reports)
+    if is_fresh("scraper", inputs):
+        skip_notice("scraper")
+        metrics.count("stage_skipped")
+        return
+
+    print("[save] writing JSON/CSV files")
+    with metrics.phase("save", output="json"):
+        save_results_json(results, "saudiexchange_results.json")
+    with metrics.phase("save", output="csv"):
+        save_results_csv(results, "saudiexchange_results.csv")
+    outputs = ["saudiexchange_results.json", "saudiexchange_results.csv", "saudiexchange_results.parquet"]
+    if reports:
+        with metrics.phase("save", output="reports"):
+            save_results_json(reports, REPORTS_RESULTS_PATH)
+        print(f"[save] wrote {len(reports)} reports to {REPORTS_RESULTS_PATH}")
+        outputs.append(REPORTS_RESULTS_PATH)
+
+    if PANDAS_AVAILABLE:
+        with metrics.phase("save", output="parquet"):
+            frame = to_typed_frame(results)
+            save_columnar(frame, RESULTS_PARQUET)
+        with metrics.phase("save", output="history"):
+            results_store.append(frame, results_store.MARKET_DATASET)
+        print("[analysis] calculating RS metrics")
+        with metrics.phase("save", output="rs_analysis"):
+            calculate_rs_metrics(results, "saudiexchange_rs_analysis.csv", frame=frame)
+    else:
+        print("[warn] pandas not available, skipping RS analysis")
+
+    # The RS files are rewritten by recalculate_rs.py, so only the raw outputs are tracked here
+    record_stage("scraper", inputs, outputs)
+
+
+def resolve_reports(spec: str) -> List[str]:
+    """Turn a comma-separated list of report names into report names to scrape.
+
+    The primary report may also be given by its option value. Any other
+    name is an option text (or value) of the Report dropdown; it is matched
+    exactly against the page when scraped, and skipped if the page has no
+    such option.
+    """
+    primary = {REPORT_VALUE_TEXT.lower(), REPORTS[REPORT_VALUE_TEXT]["value"].lower()}
+    names = []
+    for part in spec.split(","):
+        part = " ".join(part.split())
+        if not part:
+            continue
+        names.append(REPORT_VALUE_TEXT if part.lower() in primary else part)
+    return names
+
+
+def _fetch_reports_http(reports: List[str], metrics: RunMetrics, session: Optional["requests.Session"] = None,
+                        probe_fetch: Optional[Dict] = None, accept_layout=None
+                        ) -> Tuple[Dict[str, Dict[str, List[Dict[str, str]]]], Optional[str]]:
+    """Fetch ``reports`` (primary first) over one pooled HTTP session.
+
+    Returns ``{report: {period: rows}}`` for the reports that could be
+    fetched, and the portlet page's layout signature. Stops at once when
+    the primary report fails. The portlet page is requested once, or not
+    at all when ``probe_fetch`` (see probe_freshness) already holds it;
+    the probe's rows also stand in for its period of the primary report.
+    ``accept_layout`` is passed on to fetch_results_http.
+    """
+    out = {}
+    meta = {}
+    probe_fetch = probe_fetch or {}
+    page = probe_fetch.get("page")
+    own_session = session is None
+    if own_session and REQUESTS_AVAILABLE:
+        session = build_http_session()
+    try:
+        for report in reports:
+            labels = {} if report == REPORT_VALUE_TEXT else {"report": report}
+            prefetched = probe_fetch.get("rows") if report == REPORT_VALUE_TEXT else None
+            with metrics.phase("http_fetch", **labels):
+                fetched = fetch_results_http(TARGET_URL, PERIODS, session=session, report=report, meta_out=meta,
+                                             page=page, prefetched=prefetched, accept_layout=accept_layout)
+            page = meta.get("page", page)
+            if fetched is None:
+                if report == REPORT_VALUE_TEXT:
+                    break
+                print(f"[warn] [http] report {report} not fetched, leaving it out")
+                continue
+            out[report] = fetched
+    finally:
+        if own_session and session is not None:
+            session.close()
+    return out, meta.get("signature")
+
+
+def run(headless: bool = True, workers: int = 1, backend: str = "selenium", lean: bool = False,
+        probe: bool = False, probe_fallback: str = "run",
+        reports: Optional[List[str]] = None) -> Optional[Dict[str, List[Dict[str, str]]]]:
+    """Scrape every period and write the result files.
+
+    ``backend`` is ``"selenium"``, ``"http"`` or ``"auto"``. Auto uses the
+    HTTP result only for a page layout on which it has already matched the
+    Selenium output; otherwise (or when the HTTP fetch fails or looks
+    wrong) it scrapes with Selenium, and compares the two to validate the
+    layout for later runs. A layout that failed that check is not fetched
+    over HTTP again for HTTP_REVALIDATE_DAYS.
+
+    With ``probe`` a freshness probe runs first and the run returns None,
+    without starting a browser, when the portal has nothing new.
+    ``probe_fallback`` decides what a probe that could not reach the
+    portal does: ``"run"`` scrapes anyway, ``"skip"`` treats it as
+    unchanged. A probe on a page layout whose HTTP parse has not matched
+    Selenium yet always scrapes.
+
+    ``reports`` adds more report types, named by their Report dropdown
+    option text (see resolve_reports); they are scraped in the same
+    session(s) as the primary report and written to REPORTS_RESULTS_PATH
+    as ``{report: {period: rows}}``, each with the columns of its own
+    table. The legacy files stay primary-only.
+    """
+    if probe_fallback not in PROBE_FALLBACKS:
+        raise ValueError(f"probe_fallback must be one of {PROBE_FALLBACKS}, got {probe_fallback!r}")
+    extras = [r for r in reports or [] if r != REPORT_VALUE_TEXT]
+    metrics = RunMetrics(backend=backend, workers=workers, lean=lean, probe=probe,
+                         reports=[REPORT_VALUE_TEXT] + extras)
+    results = None
+    report_results = {}
+    probe_state = {}
+    probe_fetch = {}
+    # One HTTP session for the probe and the HTTP backend, so the backend
+    # can reuse the page (and form) the probe fetched
+    session = build_http_session() if REQUESTS_AVAILABLE and (probe or backend in ("http", "auto")) else None
+    try:
+        if probe:
+            with metrics.phase("freshness_probe"):
+                state = probe_freshness(TARGET_URL, session=session, state_out=probe_state, fetch_out=probe_fetch)
+            metrics.count(f"probe_{state}")
+            print(f"[probe] portal data: {state}")
+            # "skip" covers an unreachable portal, never a parse nobody has validated
+            unreachable = state == "unknown" and probe_fetch.get("validated") is None
+            if state == "unchanged" or (unreachable and probe_fallback == "skip"):
+                print("[probe] nothing new since the last run, skipping scrape")
+                return None
+        pending_validation = None
+        if backend in ("http", "auto"):
+            # auto skips the form replay on a layout that recently failed validation
+            accept = (lambda sig: not _http_rejected(sig)) if backend == "auto" else None
+            http_reports, signature = _fetch_reports_http([REPORT_VALUE_TEXT] + extras, metrics, session=session,
+                                                          probe_fetch=probe_fetch, accept_layout=accept)
+            primary = http_reports.get(REPORT_VALUE_TEXT)
+            if primary is None:
+                if backend == "http":
+                    raise RuntimeError("HTTP backend failed and Selenium fallback is disabled")
+                print("[info] HTTP backend unavailable, falling back to Selenium")
+                metrics.count("http_fallbacks")
+            elif backend == "http" or _http_trusted(signature, [REPORT_VALUE_TEXT] + extras):
+                results = primary
+                for p, rows in results.items():
+                    metrics.rows(p, len(rows))
+                metrics.meta["freshness"] = {p: "fresh" for p in results}
+                _update_period_cache(results)
+                report_results = {r: v for r, v in http_reports.items() if r != REPORT_VALUE_TEXT}
+            else:
+                print("[info] [http] output not validated for this page layout yet, "
+                      "scraping with Selenium to check it")
+                metrics.count("http_validations")
+                pending_validation = (http_reports, signature)
+        if results is None:
+            results = scrape_with_fallback(PERIODS, workers, headless=headless, lean=lean, metrics=metrics,
+                                           extra_reports=extras, extra_out=report_results)
+            if pending_validation is not None:
+                http_reports, signature = pending_validation
+                selenium_reports = dict(report_results, **{REPORT_VALUE_TEXT: results})
+                metrics.meta["http_validation"] = validate_http_results(http_reports, signature, selenium_reports)
+        combined = None
+        if extras:
+            combined = {REPORT_VALUE_TEXT: results}
+            combined.update((r, {p: report_results[r][p] for p in PERIODS if p in report_results[r]})
+                            for r in extras if r in report_results)
+        save_results(results, metrics, reports=combined)
+        if probe_state:
+            save_probe_state(probe_state)
+        return results
+    finally:
+        if session is not None:
+            session.close()
+        metrics.write(METRICS_PATH)
+
+
+def _arg_value(args: List[str], name: str) -> Optional[str]:
+    """Return the value of ``--name value`` or ``--name=value`` from argv."""
+    for i, a in enumerate(args):
+        if a == name and i + 1 < len(args):
+            return args[i + 1]
+        if a.startswith(name + "="):
+            return a.split("=", 1)[1]
+    return None
+
+
 if __name__ == "__main__":
-    headless = True
-    if len(sys.argv) > 1 and sys.argv[1].lower() in ("--show", "--headed", "--no-headless"):
-        headless = False
-    res = run(headless=headless)
+    args = [a.lower() for a in sys.argv[1:]]
+    headless = not any(a in ("--show", "--headed", "--no-headless") for a in args)
+    if "--compare-extraction" in args:
+        benchmark_extraction(headless=headless)
+        sys.exit(0)
+    if "--compare-lean" in args:
+        compare_driver_modes(headless=headless)
+        sys.exit(0)
+    if "--offline" in args:
+        os.environ["SCRAPER_OFFLINE"] = "1"
+    lean = "--lean" in args or os.environ.get("SCRAPER_LEAN") == "1"
+    workers = int(_arg_value(args, "--workers") or os.environ.get("SCRAPER_WORKERS") or 1)
+    backend = _arg_value(args, "--backend") or os.environ.get("SCRAPER_BACKEND") or "selenium"
+    probe = "--probe" in args or os.environ.get("SCRAPER_PROBE") == "1"
+    probe_fallback = _arg_value(args, "--probe-fallback") or os.environ.get("SCRAPER_PROBE_FALLBACK") or "run"
+    # report names keep their case: they are matched against the dropdown and key the output
+    reports = resolve_reports(_arg_value(sys.argv[1:], "--reports") or os.environ.get("SCRAPER_REPORTS") or "")
+    res = run(headless=headless, workers=workers, backend=backend, lean=lean,
+              probe=probe, probe_fallback=probe_fallback, reports=reports)
+    if res is None:
+        sys.exit(0)
     print(json.dumps(res, ensure_ascii=False, indent=2))
 
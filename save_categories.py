@@ -8,6 +8,8 @@ import pandas as pd
 import json
 from pathlib import Path
 
+from pipeline_manifest import fingerprint, is_fresh, record_stage, skip_notice
+
 def save_previous_categories():
     """Read current RS analysis and save category mapping"""
     
@@ -18,6 +20,11 @@ def save_previous_categories():
         print("[warn] saudiexchange_rs_analysis.csv not found, skipping category save")
         return
     
+    inputs = fingerprint([str(csv_path)])
+    if is_fresh('save_categories', inputs):
+        skip_notice('save_categories')
+        return
+    
     try:
         df = pd.read_csv(csv_path, encoding='utf-8-sig')
         print(f"[info] Read {len(df)} rows from {csv_path}")
@@ -65,6 +72,7 @@ def save_previous_categories():
             json.dump(categories, f, ensure_ascii=False, indent=2)
         
         print(f"[success] Saved {len(categories)} stock categories to {json_path}")
+        record_stage('save_categories', inputs, [str(json_path)])
         
     except Exception as e:
         print(f"[error] Failed to save categories: {e}")
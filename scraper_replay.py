@@ -0,0 +1,411 @@
+"""
+Offline record/replay harness and benchmark suite for the Saudi Exchange scraper.
+
+record  - drive the live portal once and snapshot the page plus the market
+          tables for every period into a fixtures directory
+synth   - build an equivalent fixture set from saudiexchange_results.json
+          (no network needed)
+serve   - serve a fixture set locally; a small injected script swaps the
+          tables when the period dropdown changes, like the real portlet
+bench   - time every scraper phase against the local server and optionally
+          compare with a saved baseline to catch regressions
+"""
+
+import argparse
+import html
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import saudi_exchange_scraper as scraper
+
+DEFAULT_FIXTURES_DIR = os.path.join("fixtures", "portal")
+# replay runs keep their own frame cache, the live one stays keyed to the portal URL
+REPLAY_FRAME_CACHE_PATH = ".scraper_replay_frame_cache.json"
+MANIFEST_NAME = "manifest.json"
+PAGE_NAME = "page.html"
+
+# Injected into the served page. Mirrors the portlet: a change on a period
+# <select> fetches that period's tables and swaps them in after an optional
+# artificial server delay.
+_REPLAY_SCRIPT = """
+<script>
+(function(){
+  var DELAY = %(delay)d;
+  document.addEventListener('change', function(ev){
+    var sel = ev.target;
+    if (!sel || sel.tagName !== 'SELECT') return;
+    var opt = sel.options[sel.selectedIndex];
+    if (!opt) return;
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', '/__replay/tables?text=' + encodeURIComponent(opt.text.trim()) +
+                    '&value=' + encodeURIComponent(opt.value));
+    xhr.onload = function(){
+      if (xhr.status !== 200) return;
+      setTimeout(function(){
+        var tmp = document.createElement('div');
+        tmp.innerHTML = xhr.responseText;
+        Array.prototype.forEach.call(tmp.querySelectorAll('table[id]'), function(t){
+          var cur = document.getElementById(t.id);
+          if (cur) cur.parentNode.replaceChild(t, cur);
+        });
+      }, DELAY);
+    };
+    xhr.send();
+  }, true);
+})();
+</script>
+"""
+
+# Marks tables hidden by the live stylesheet with an inline display:none so
+# the fixture keeps the same visibility once the portal CSS is gone.
+_SNAPSHOT_TABLES_JS = """
+return (function(ids){
+  return ids.map(function(id){
+    const t = document.getElementById(id);
+    if (!t) return '';
+    const c = t.cloneNode(true);
+    if (!(t.getClientRects().length > 0 && window.getComputedStyle(t).visibility !== 'hidden')) {
+      c.setAttribute('style', 'display:none');
+    }
+    return c.outerHTML;
+  }).join('\\n');
+})(arguments[0]);
+"""
+
+_SELECTED_PERIOD_VALUE_JS = """
+return (function(variants){
+  const sels = Array.from(document.querySelectorAll('select'));
+  for (const s of sels) {
+    const o = s.options[s.selectedIndex];
+    if (o && variants.some(function(v){ return o.text.trim().toLowerCase() === v.toLowerCase(); })) return o.value;
+  }
+  return null;
+})(arguments[0]);
+"""
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")
+
+
+def _strip_scripts(page: str) -> str:
+    page = re.sub(r"<script\b[^>]*>.*?</script>", "", page, flags=re.S | re.I)
+    return re.sub(r"<link\b[^>]*rel=[\"']?stylesheet[^>]*>", "", page, flags=re.I)
+
+
+def _write_fixtures(out_dir: str, page: str, periods: Dict[str, Dict[str, str]], source: str) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, PAGE_NAME), "w", encoding="utf-8") as f:
+        f.write(page)
+    manifest = {"source": source, "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "periods": {}}
+    for period, item in periods.items():
+        fname = f"tables_{_slug(period)}.html"
+        with open(os.path.join(out_dir, fname), "w", encoding="utf-8") as f:
+            f.write(item["tables"])
+        manifest["periods"][period] = {"file": fname, "value": item.get("value")}
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"[replay] wrote {len(periods)} period fixtures to {out_dir}")
+
+
+def record(out_dir: str = DEFAULT_FIXTURES_DIR, headless: bool = True) -> None:
+    """Snapshot the live portal: the page after report selection and the tables per period."""
+    driver = scraper.build_driver(headless=headless)
+    try:
+        wait = scraper.open_target(driver)
+        scraper.select_and_wait(driver, wait, lambda: scraper.select_report(driver, wait))
+        page = _strip_scripts(driver.execute_script("return document.documentElement.outerHTML"))
+        tables = driver.execute_script(_SNAPSHOT_TABLES_JS, scraper.MARKET_TABLE_IDS)
+        for table_id in scraper.MARKET_TABLE_IDS:
+            # Replace the live tables in the page with their visibility-marked copies.
+            page = re.sub(rf"<table\b[^>]*\bid=[\"']?{table_id}\b.*?</table>", "", page, count=1, flags=re.S)
+        page = page.replace("</body>", f"{tables}\n</body>", 1)
+        periods = {}
+        for p in scraper.PERIODS:
+            scraper.select_and_wait(driver, wait, lambda: scraper.select_period(driver, wait, p))
+            periods[p] = {
+                "tables": driver.execute_script(_SNAPSHOT_TABLES_JS, scraper.MARKET_TABLE_IDS),
+                "value": driver.execute_script(_SELECTED_PERIOD_VALUE_JS, scraper._period_variants(p)),
+            }
+            print(f"[replay] recorded {p}")
+        _write_fixtures(out_dir, page, periods, source=scraper.TARGET_URL)
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+def _synthetic_tables(rows: List[Dict[str, str]]) -> str:
+    def _change(r):
+        try:
+            return float(r.get("Change %", "").replace("%", "").replace(",", ""))
+        except ValueError:
+            return 0.0
+
+    def _tr(r):
+        name = html.escape(r.get("Company", ""))
+        sym = r.get("Symbol") or ""
+        first = f'<a href="/company/{sym}">{name}</a>' if sym else name
+        cells = "".join(f"<td>{html.escape(r.get(h, ''))}</td>" for h in scraper.EXPECTED_HEADERS[2:])
+        return f"<tr><td>{first}</td>{cells}</tr>"
+
+    head = "<thead><tr>" + "".join(
+        f"<th>{h}</th>" for h in scraper.EXPECTED_HEADERS if h != "Symbol") + "</tr></thead>"
+    gainers = [r for r in rows if _change(r) >= 0]
+    losers = [r for r in rows if _change(r) < 0]
+    return "\n".join([
+        f'<table id="{scraper.MARKET_TABLE_IDS[0]}" style="display:none">{head}<tbody></tbody></table>',
+        f'<table id="{scraper.MARKET_TABLE_IDS[1]}">{head}<tbody>{"".join(_tr(r) for r in gainers)}</tbody></table>',
+        f'<table id="{scraper.MARKET_TABLE_IDS[2]}">{head}<tbody>{"".join(_tr(r) for r in losers)}</tbody></table>',
+    ])
+
+
+def synthesize(results_path: str = "saudiexchange_results.json", out_dir: str = DEFAULT_FIXTURES_DIR) -> None:
+    """Build a fixture set from a previous scrape so the harness works without network access."""
+    with open(results_path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    periods = {p: {"tables": _synthetic_tables(rows), "value": _slug(p)} for p, rows in results.items()}
+    first = next(iter(results))
+    period_opts = "".join(
+        f'<option value="{_slug(p)}"{" selected" if p == first else ""}>{html.escape(p)}</option>' for p in results)
+    page = f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Market Performance (replay)</title></head>
+<body>
+<form action="/" method="get">
+<label for="reportFilter">Report</label>
+<select id="reportFilter" name="reportFilter">
+<option value="{scraper.REPORT_VALUE}" selected>{scraper.REPORT_VALUE_TEXT}</option>
+<option value="mostActiveVolume">Most Active by Volume</option>
+<option value="mostActiveValue">Most Active by Value</option>
+</select>
+<label for="timeFrameFilter">Period</label>
+<select id="timeFrameFilter" name="timeFrameFilter">{period_opts}</select>
+</form>
+{periods[first]["tables"]}
+</body></html>
+"""
+    _write_fixtures(out_dir, page, periods, source=os.path.abspath(results_path))
+
+
+class ReplayServer:
+    """Serves a fixture set on 127.0.0.1 in a background thread."""
+
+    def __init__(self, fixtures_dir: str = DEFAULT_FIXTURES_DIR, delay_ms: int = 0, port: int = 0):
+        with open(os.path.join(fixtures_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(fixtures_dir, PAGE_NAME), "r", encoding="utf-8") as f:
+            self.page = f.read()
+        self.tables = {}
+        for period, item in self.manifest["periods"].items():
+            with open(os.path.join(fixtures_dir, item["file"]), "r", encoding="utf-8") as f:
+                self.tables[period] = f.read()
+        self.delay_ms = delay_ms
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/"
+
+    def _period_for(self, text: Optional[str], value: Optional[str]) -> Optional[str]:
+        for period, item in self.manifest["periods"].items():
+            if value and item.get("value") == value:
+                return period
+            if text and any(text.lower() == v.lower() for v in scraper._period_variants(period)):
+                return period
+        return None
+
+    def _render_page(self, period: Optional[str]) -> str:
+        page = self.page
+        if period:
+            # Server-side render of another period, as the HTTP backend expects.
+            for table_id in scraper.MARKET_TABLE_IDS:
+                page = re.sub(rf"<table\b[^>]*\bid=[\"']?{table_id}\b.*?</table>", "", page, count=1, flags=re.S)
+            page = page.replace("</body>", f"{self.tables[period]}\n</body>", 1)
+        return page.replace("</body>", (_REPLAY_SCRIPT % {"delay": self.delay_ms}) + "</body>", 1)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: str = "", ctype: str = "text/html; charset=utf-8"):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                qs = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                if parsed.path == "/__replay/tables":
+                    period = server._period_for(qs.get("text"), qs.get("value"))
+                    if period is None:
+                        self._send(204)
+                    else:
+                        self._send(200, server.tables[period])
+                    return
+                if parsed.path in ("/", "/index.html"):
+                    period = None
+                    for v in qs.values():
+                        period = server._period_for(v, v)
+                        if period:
+                            break
+                    self._send(200, server._render_page(period))
+                    return
+                self._send(404, "not found", "text/plain")
+
+        return Handler
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        print(f"[replay] serving fixtures at {self.url}")
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ReplayServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def _timed(timings: Dict[str, List[float]], phase: str, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    timings.setdefault(phase, []).append(time.perf_counter() - t0)
+    return result
+
+
+def benchmark(fixtures_dir: str = DEFAULT_FIXTURES_DIR, repeats: int = 3, headless: bool = True,
+              lean: bool = False, delay_ms: int = 0) -> Dict[str, Dict[str, float]]:
+    """Time each scraper phase against the replay server.
+
+    Per-period phases (select/wait/extract) are pooled across periods; the
+    select and wait phases come from scraper.select_and_wait's own metrics.
+    Returns ``{phase: {"median", "min", "max", "n"}}`` in seconds.
+    """
+    timings: Dict[str, List[float]] = {}
+    counters: Dict[str, int] = {}
+    with ReplayServer(fixtures_dir, delay_ms=delay_ms) as srv:
+        for i in range(repeats):
+            print(f"[bench] repeat {i + 1}/{repeats}")
+            _timed(timings, "http_fetch", lambda: scraper.fetch_results_http(srv.url, scraper.PERIODS))
+            driver = _timed(timings, "build_driver", lambda: scraper.build_driver(headless=headless, lean=lean))
+            try:
+                wait = _timed(timings, "open_target", lambda: scraper.open_target(
+                    driver, srv.url, frame_cache_path=REPLAY_FRAME_CACHE_PATH))
+                # The real select/wait path; its select_*/wait_* phases are read back below
+                metrics = scraper.RunMetrics()
+                scraper.select_and_wait(driver, wait, lambda: scraper.select_report(driver, wait), metrics,
+                                        "select_report")
+                for p in scraper.PERIODS:
+                    scraper.select_and_wait(driver, wait, lambda: scraper.select_period(driver, wait, p), metrics,
+                                            "select_period", period=p)
+                    _timed(timings, "extract_js", lambda: scraper._scrape_all_tables_via_js(driver))
+                    _timed(timings, "extract_selenium", lambda: scraper._scrape_all_tables_via_selenium(driver))
+                for entry in metrics.phases:
+                    timings.setdefault(entry["phase"], []).append(entry["seconds"])
+                for name, n in metrics.counters.items():
+                    counters[name] = counters.get(name, 0) + n
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+    summary = {
+        phase: {"median": statistics.median(v), "min": min(v), "max": max(v), "n": len(v)}
+        for phase, v in timings.items()
+    }
+    if counters.get("wait_timeouts"):
+        print(f"[bench] warning: {counters['wait_timeouts']} waits timed out; their phases time the timeout")
+    print(f"\n{'phase':<18} {'median':>9} {'min':>9} {'max':>9} {'n':>4}")
+    for phase, st in summary.items():
+        print(f"{phase:<18} {st['median']:>8.3f}s {st['min']:>8.3f}s {st['max']:>8.3f}s {st['n']:>4}")
+    return summary
+
+
+def compare_to_baseline(summary: Dict[str, Dict[str, float]], baseline_path: str,
+                        tolerance: float = 0.25, min_delta: float = 0.05) -> List[str]:
+    """Return the phases whose median regressed beyond ``tolerance`` (and ``min_delta`` seconds)."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for phase, st in summary.items():
+        base = baseline.get(phase)
+        if not base:
+            continue
+        delta = st["median"] - base["median"]
+        if delta > min_delta and st["median"] > base["median"] * (1 + tolerance):
+            regressions.append(phase)
+            print(f"[bench] REGRESSION {phase}: {base['median']:.3f}s -> {st['median']:.3f}s")
+    if not regressions:
+        print("[bench] no regressions against baseline")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_rec = sub.add_parser("record", help="snapshot the live portal into fixtures")
+    p_rec.add_argument("--out", default=DEFAULT_FIXTURES_DIR)
+    p_rec.add_argument("--show", action="store_true", help="run Chrome with a window")
+    p_syn = sub.add_parser("synth", help="build fixtures from saudiexchange_results.json")
+    p_syn.add_argument("--results", default="saudiexchange_results.json")
+    p_syn.add_argument("--out", default=DEFAULT_FIXTURES_DIR)
+    p_srv = sub.add_parser("serve", help="serve fixtures until interrupted")
+    p_srv.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    p_srv.add_argument("--port", type=int, default=8765)
+    p_srv.add_argument("--delay-ms", type=int, default=0)
+    p_bench = sub.add_parser("bench", help="time scraper phases against the fixtures")
+    p_bench.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR)
+    p_bench.add_argument("--repeats", type=int, default=3)
+    p_bench.add_argument("--delay-ms", type=int, default=0)
+    p_bench.add_argument("--lean", action="store_true")
+    p_bench.add_argument("--show", action="store_true")
+    p_bench.add_argument("--out", help="write the timing summary to this JSON file")
+    p_bench.add_argument("--baseline", help="compare against a previous --out file")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "record":
+        record(args.out, headless=not args.show)
+    elif args.cmd == "synth":
+        synthesize(args.results, args.out)
+    elif args.cmd == "serve":
+        srv = ReplayServer(args.fixtures, delay_ms=args.delay_ms, port=args.port).start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            srv.stop()
+    elif args.cmd == "bench":
+        summary = benchmark(args.fixtures, args.repeats, headless=not args.show, lean=args.lean,
+                            delay_ms=args.delay_ms)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+            print(f"[bench] saved summary to {args.out}")
+        if args.baseline and compare_to_baseline(summary, args.baseline):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+# the modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PERIOD_VALUES = {"1Y": "1 Year", "9M": "9 Months", "6M": "6 Months", "3M": "3 Months"}
+PRIMARY = "Gainers/Losers by Percentage"
+
+# Report option value -> (option text, table columns). The extra reports'
+# layouts are made up for the tests; the parser must follow the headers.
+REPORT_LAYOUTS = {
+    "gainersPercentage": (PRIMARY, ["Company", "Open", "Highest", "Lowest", "Close", "Change", "Change %",
+                                    "Volume Traded", "Value Traded"]),
+    "byVolume": ("Most Active by Volume", ["Company", "Volume Traded", "Close", "Change (%)"]),
+    "byValue": ("Most Active by Value", ["Company", "Value Traded", "Last Trade", "Close"]),
+}
+REPORT_TEXTS = {text: value for value, (text, _) in REPORT_LAYOUTS.items()}
+
+# marketPerformanceTable1 is hidden by an id rule, marketPerformanceTable3 by a
+# class rule; only marketPerformanceTable2 is visible in a browser.
+PAGE = """<html><head>
+<link rel="stylesheet" href="/static/portal.css">
+<style>
+/* market tabs */
+#marketPerformanceTable1 {{ display: none; }}
+.tab-hidden {{ visibility: hidden }}
+</style></head><body>
+<form method="post" action="/portlet">
+<input type="hidden" name="token" value="abc123">
+<select id="reportList" name="reportList">{report_options}</select>
+<select id="periodList" name="periodList">
+  <option value="1Y" selected>1 Year</option><option value="9M">9 Months</option>
+  <option value="6M">6 Months</option><option value="3M">3 Months</option>
+</select>
+</form>
+<table id="marketPerformanceTable1"><thead>{head}</thead><tbody>{hidden_rows}</tbody></table>
+<table id="marketPerformanceTable2"><thead>{head}</thead><tbody>{rows}</tbody></table>
+<table id="marketPerformanceTable3" class="market tab-hidden"><thead>{head}</thead><tbody>{hidden_rows}</tbody></table>
+</body></html>"""
+
+
+def _values(period: str, day: int):
+    change = {"1 Year": 8, "9 Months": 6, "6 Months": 4, "3 Months": 2}[period] + day
+    return {"Open": "10.00", "Highest": "11.00", "Lowest": "9.50", "Close": "10.80", "Change": "0.80",
+            "Change %": f"{change:.2f}%", "Change (%)": f"{change:.2f}%", "Volume Traded": "1,200",
+            "Value Traded": "12,960", "Last Trade": "10:45"}
+
+
+def portal_rows(period: str, day: int = 0, report: str = PRIMARY):
+    """The visible rows the fixture portal renders for ``report``/``period`` on trading ``day`` (as parsed)."""
+    values = _values(period, day)
+    row = {"Company": "ACME", "Symbol": "1234"}
+    for col in REPORT_LAYOUTS[REPORT_TEXTS[report]][1][1:]:
+        row["Change %" if col == "Change (%)" else col] = values[col]
+    for h in ("Open", "Highest", "Lowest", "Close", "Change", "Change %", "Volume Traded", "Value Traded"):
+        row.setdefault(h, "")
+    return [row]
+
+
+def _tr(symbol: str, company: str, columns, values) -> str:
+    cells = "".join(f"<td>{values[c]}</td>" for c in columns[1:])
+    return f'<tr><td><a href="/company/{symbol}">{company}</a></td>{cells}</tr>'
+
+
+def render(period: str, day: int = 0, report_value: str = "gainersPercentage") -> str:
+    columns = REPORT_LAYOUTS[report_value][1]
+    values = _values(period, day)
+    options = "".join(f'<option value="{v}"{" selected" if v == report_value else ""}>{text}</option>'
+                      for v, (text, _) in REPORT_LAYOUTS.items())
+    return PAGE.format(report_options=options, head="<tr>" + "".join(f"<th>{c}</th>" for c in columns) + "</tr>",
+                       rows=_tr("1234", "ACME", columns, values),
+                       hidden_rows=_tr("9999", "HIDDEN CO", columns, dict(values, **{"Change %": "99.00%"})))
+
+
+class PortalServer:
+    """Local stand-in for the market performance portlet (server-rendered form replay)."""
+
+    def __init__(self):
+        self.gets = 0
+        self.posts = []
+        self.ignore_period = False
+        self.day = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, body: str):
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                server.gets += 1
+                self._send(render("1 Year", server.day))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()}
+                server.posts.append(form)
+                period = "1 Year" if server.ignore_period else PERIOD_VALUES.get(form.get("periodList"), "1 Year")
+                self._send(render(period, server.day, form.get("reportList", "gainersPercentage")))
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_port}/"
+
+
+@pytest.fixture
+def portal():
+    srv = PortalServer()
+    srv._thread.start()
+    try:
+        yield srv
+    finally:
+        srv._httpd.shutdown()
+        srv._httpd.server_close()
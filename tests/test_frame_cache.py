@@ -0,0 +1,72 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import saudi_exchange_scraper as scraper
+
+TABLE = [{"index": 0, "id": "outer"}, {"index": 1, "id": "tables"}]
+CONTROLS = [{"index": 0, "id": "outer"}]
+
+
+@pytest.fixture
+def frames(monkeypatch):
+    """Fake frame tree: ``valid`` maps each kind to the path that currently reaches it."""
+    state = {"valid": {"table": TABLE, "controls": CONTROLS}, "entered": None, "dfs": []}
+    driver = SimpleNamespace(switch_to=SimpleNamespace(default_content=lambda: None))
+
+    def enter(driver, path, counter=None):
+        state["entered"] = path
+
+    def has(driver, kind, counter):
+        return state["valid"].get(kind) == state["entered"]
+
+    def dfs(kind):
+        def search(driver, counter=None, path_out=None):
+            state["dfs"].append(kind)
+            if kind not in state["valid"]:
+                return False
+            path_out.extend(state["valid"][kind])
+            return True
+        return search
+
+    monkeypatch.setattr(scraper, "_enter_frame_path", enter)
+    monkeypatch.setattr(scraper, "_frame_has", has)
+    monkeypatch.setattr(scraper, "switch_to_frame_with_table", dfs("table"))
+    monkeypatch.setattr(scraper, "switch_to_frame_with_controls", dfs("controls"))
+    state["driver"] = driver
+    return state
+
+
+def _write(path, **entries):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(dict(entries, url="http://portal/"), f)
+
+
+def test_every_cached_kind_is_tried_before_the_dfs(frames, tmp_path):
+    path = str(tmp_path / "frames.json")
+    _write(path, table={"path": [{"index": 3}]}, controls={"path": CONTROLS})
+
+    assert scraper.locate_target_frame(frames["driver"], "http://portal/", path)
+    assert frames["dfs"] == []
+    assert frames["entered"] == CONTROLS
+
+
+def test_rediscovery_merges_and_drops_stale_paths(frames, tmp_path):
+    path = str(tmp_path / "frames.json")
+    _write(path, table={"path": [{"index": 3}]}, controls={"path": [{"index": 4}]})
+    del frames["valid"]["table"]
+
+    assert scraper.locate_target_frame(frames["driver"], "http://portal/", path)
+    assert frames["dfs"] == ["table", "controls"]
+    cache = scraper._load_frame_cache("http://portal/", path)
+    assert set(cache) == {"controls", "url"}
+    assert cache["controls"]["path"] == CONTROLS
+
+    # the controls path has gone stale as well: dropped, not retried on every run
+    frames["valid"] = {"table": TABLE}
+    frames["dfs"].clear()
+    assert scraper.locate_target_frame(frames["driver"], "http://portal/", path)
+    cache = scraper._load_frame_cache("http://portal/", path)
+    assert set(cache) == {"table", "url"}
+    assert cache["table"]["path"] == TABLE
@@ -0,0 +1,100 @@
+import json
+
+import saudi_exchange_scraper as scraper
+from conftest import portal_rows
+
+
+def test_fetch_replays_the_form_and_skips_css_hidden_tables(portal):
+    meta = {}
+    results = scraper.fetch_results_http(portal.url, scraper.PERIODS, meta_out=meta)
+
+    assert results == {p: portal_rows(p) for p in scraper.PERIODS}
+    assert [post["periodList"] for post in portal.posts] == ["1Y", "9M", "6M", "3M"]
+    assert all(post["token"] == "abc123" and post["reportList"] == "gainersPercentage" for post in portal.posts)
+    assert meta["signature"]
+
+
+def test_inline_hidden_tables_are_skipped():
+    html = ('<table id="marketPerformanceTable1" style="display: none"><tr><td>HIDDEN</td></tr></table>'
+            '<table id="marketPerformanceTable2"><tr><td><a href="/x/1234">ACME</a></td><td>1</td></tr></table>')
+
+    rows = scraper.parse_market_tables_html(html)
+
+    assert [r["Company"] for r in rows] == ["ACME"]
+
+
+def test_identical_periods_are_rejected(portal):
+    portal.ignore_period = True
+
+    assert scraper.fetch_results_http(portal.url, scraper.PERIODS) is None
+
+
+def test_http_is_trusted_only_after_matching_selenium(portal, tmp_path):
+    path = str(tmp_path / "validation.json")
+    meta = {}
+    http = {scraper.REPORT_VALUE_TEXT: scraper.fetch_results_http(portal.url, scraper.PERIODS, meta_out=meta)}
+    signature = meta["signature"]
+    assert not scraper._http_trusted(signature, [scraper.REPORT_VALUE_TEXT], path)
+
+    # Selenium only sees the visible table; a parse that included hidden rows must not validate
+    with_hidden = {p: rows + [dict(rows[0], Company="HIDDEN CO", Symbol="9999")]
+                   for p, rows in http[scraper.REPORT_VALUE_TEXT].items()}
+    assert scraper.validate_http_results({scraper.REPORT_VALUE_TEXT: with_hidden}, signature, http, path) == \
+        {scraper.REPORT_VALUE_TEXT: False}
+    assert not scraper._http_trusted(signature, [scraper.REPORT_VALUE_TEXT], path)
+
+    selenium = {scraper.REPORT_VALUE_TEXT: {p: portal_rows(p) for p in scraper.PERIODS}}
+    assert scraper.validate_http_results(http, signature, selenium, path) == {scraper.REPORT_VALUE_TEXT: True}
+    assert scraper._http_trusted(signature, [scraper.REPORT_VALUE_TEXT], path)
+    assert not scraper._http_trusted("other-layout", [scraper.REPORT_VALUE_TEXT], path)
+    assert not scraper._http_trusted(signature, [scraper.REPORT_VALUE_TEXT, "Most Active by Volume"], path)
+
+
+def test_stale_selenium_rows_never_validate(portal, tmp_path):
+    path = str(tmp_path / "validation.json")
+    http = {scraper.REPORT_VALUE_TEXT: {p: portal_rows(p) for p in scraper.PERIODS}}
+    selenium = {scraper.REPORT_VALUE_TEXT: {p: [dict(r, Stale="2026-01-01T10:00:00") for r in portal_rows(p)]
+                                            for p in scraper.PERIODS}}
+
+    assert scraper.validate_http_results(http, "sig", selenium, path) == {scraper.REPORT_VALUE_TEXT: False}
+    assert not scraper._http_trusted("sig", [scraper.REPORT_VALUE_TEXT], path)
+
+
+def test_auto_mode_scrapes_with_selenium_until_the_layout_is_validated(portal, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper, "TARGET_URL", portal.url)
+    selenium_runs = []
+
+    def fake_selenium(periods, *args, **kwargs):
+        selenium_runs.append(list(periods))
+        return {p: portal_rows(p) for p in periods}
+
+    monkeypatch.setattr(scraper, "scrape_with_fallback", fake_selenium)
+
+    first = scraper.run(backend="auto")
+    second = scraper.run(backend="auto")
+
+    assert first == second == {p: portal_rows(p) for p in scraper.PERIODS}
+    assert len(selenium_runs) == 1
+
+
+def test_auto_mode_stops_replaying_a_rejected_layout(portal, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper, "TARGET_URL", portal.url)
+    # Selenium sees a row the HTTP parse misses, so the layout never validates
+    monkeypatch.setattr(scraper, "scrape_with_fallback", lambda periods, *a, **kw: {
+        p: portal_rows(p) + [dict(portal_rows(p)[0], Company="OTHER", Symbol="4321")] for p in periods})
+
+    scraper.run(backend="auto")
+    assert len(portal.posts) == 4
+    portal.posts.clear()
+
+    scraper.run(backend="auto")
+    assert portal.posts == []
+
+    record = scraper._load_json_dict(scraper.HTTP_VALIDATION_PATH)
+    record["rejected_at"] = "2020-01-01T00:00:00"
+    with open(scraper.HTTP_VALIDATION_PATH, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    scraper.run(backend="auto")
+    assert len(portal.posts) == 4
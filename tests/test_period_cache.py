@@ -0,0 +1,39 @@
+import json
+
+import pandas as pd
+
+import saudi_exchange_scraper as scraper
+from market_data import stale_periods, to_typed_frame
+
+ROWS = [{"Company": "ACME", "Symbol": "1234", "Change %": "1.5%"}]
+
+
+def test_unchanged_rows_do_not_rewrite_the_cache(tmp_path):
+    path = str(tmp_path / "period_cache.json")
+    scraper._update_period_cache({"1 Year": ROWS}, path)
+    with open(path, encoding="utf-8") as f:
+        first = f.read()
+
+    scraper._update_period_cache({"1 Year": [dict(r) for r in ROWS]}, path)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == first
+
+    changed = [dict(ROWS[0], **{"Change %": "2.0%"})]
+    scraper._update_period_cache({"1 Year": changed}, path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["1 Year"]["rows"] == changed
+
+
+def test_stale_rows_are_not_cached(tmp_path):
+    path = str(tmp_path / "period_cache.json")
+    scraper._update_period_cache({"1 Year": [dict(ROWS[0], Stale="2026-01-01T10:00:00")]}, path)
+    assert scraper._load_period_cache(path) == {}
+
+
+def test_stale_periods_are_reported():
+    df = to_typed_frame({
+        "1 Year": ROWS,
+        "3 Months": [dict(ROWS[0], Stale="2026-01-01T10:00:00")],
+    })
+    assert stale_periods(df) == {"3 Months": "2026-01-01T10:00:00"}
+    assert stale_periods(pd.DataFrame({"period": ["1 Year"]})) == {}
@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import saudi_exchange_scraper as scraper
+from conftest import portal_rows
+
+
+def _validate(portal, path):
+    meta = {}
+    http = {scraper.REPORT_VALUE_TEXT: scraper.fetch_results_http(portal.url, scraper.PERIODS, meta_out=meta)}
+    scraper.validate_http_results(http, meta["signature"], http, path)
+    portal.posts.clear()
+
+
+def test_probe_is_inconclusive_until_the_layout_is_validated(portal, tmp_path):
+    path, validation = str(tmp_path / "probe.json"), str(tmp_path / "validation.json")
+    state = {}
+    assert scraper.probe_freshness(portal.url, state_path=path, state_out=state,
+                                   validation_path=validation) == "unknown"
+    scraper.save_probe_state(state, path)
+    # a stable but unvalidated parse must never read as "unchanged"
+    assert scraper.probe_freshness(portal.url, state_path=path, validation_path=validation) == "unknown"
+
+    _validate(portal, validation)
+
+    assert scraper.probe_freshness(portal.url, state_path=path, validation_path=validation) == "unchanged"
+
+
+def test_probe_compares_against_its_own_last_digest(portal, tmp_path):
+    path, validation = str(tmp_path / "probe.json"), str(tmp_path / "validation.json")
+    _validate(portal, validation)
+    state = {}
+    assert scraper.probe_freshness(portal.url, state_path=path, state_out=state,
+                                   validation_path=validation) == "changed"
+    scraper.save_probe_state(state, path)
+
+    assert scraper.probe_freshness(portal.url, state_path=path, validation_path=validation) == "unchanged"
+    portal.day = 1
+    assert scraper.probe_freshness(portal.url, state_path=path, validation_path=validation) == "changed"
+
+
+def test_probe_ignores_the_selenium_results_file(portal, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path, validation = str(tmp_path / "probe.json"), str(tmp_path / "validation.json")
+    _validate(portal, validation)
+    state = {}
+    scraper.probe_freshness(portal.url, state_path=path, state_out=state, validation_path=validation)
+    scraper.save_probe_state(state, path)
+    # results saved by Selenium carry extra keys and other formatting; they play no part
+    with open("saudiexchange_results.json", "w", encoding="utf-8") as f:
+        json.dump({p: [dict(r, Extra=" x ") for r in portal_rows(p)] for p in scraper.PERIODS}, f)
+
+    assert scraper.probe_freshness(portal.url, state_path=path, validation_path=validation) == "unchanged"
+
+
+def test_probe_is_unknown_when_the_portal_is_unreachable(portal, tmp_path):
+    url = portal.url
+    portal._httpd.shutdown()
+    portal._httpd.server_close()
+
+    assert scraper.probe_freshness(url, state_path=str(tmp_path / "probe.json")) == "unknown"
+
+
+@pytest.fixture
+def selenium(portal, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper, "TARGET_URL", portal.url)
+    runs = []
+
+    def fake_selenium(periods, *args, **kwargs):
+        if runs and runs[-1] == "fail":
+            runs.pop()
+            raise RuntimeError("browser crashed")
+        runs.append(list(periods))
+        return {p: portal_rows(p, portal.day) for p in periods}
+
+    monkeypatch.setattr(scraper, "scrape_with_fallback", fake_selenium)
+    return runs
+
+
+def test_run_skips_unchanged_data_and_only_records_completed_runs(portal, selenium):
+    # validates the layout against Selenium; the probe could not vouch for anything yet
+    assert scraper.run(probe=True, backend="auto") is not None
+    assert scraper.run(probe=True) is None
+    portal.day = 1
+    selenium.append("fail")
+    with pytest.raises(RuntimeError):
+        scraper.run(probe=True)
+    assert scraper.run(probe=True) == {p: portal_rows(p, 1) for p in scraper.PERIODS}
+    assert len(selenium) == 2
+
+
+def test_skip_fallback_never_skips_an_unvalidated_parse(portal, selenium):
+    assert scraper.run(probe=True, probe_fallback="skip") is not None
+    assert scraper.run(probe=True, probe_fallback="skip") is not None
+    assert len(selenium) == 2
+
+
+def test_http_backend_reuses_the_probed_page(portal, selenium):
+    scraper.run(backend="auto")
+    portal.day = 1
+    portal.gets, portal.posts = 0, []
+
+    assert scraper.run(probe=True, backend="auto") == {p: portal_rows(p, 1) for p in scraper.PERIODS}
+    assert portal.gets == 1
+    assert sorted(post["periodList"] for post in portal.posts) == ["1Y", "3M", "6M", "9M"]
+    assert len(selenium) == 1
@@ -0,0 +1,85 @@
+import pytest
+
+import saudi_exchange_scraper as scraper
+from conftest import REPORT_LAYOUTS, portal_rows, render
+
+
+@pytest.mark.parametrize("value", list(REPORT_LAYOUTS))
+def test_each_report_is_parsed_by_its_own_headers(value):
+    text = REPORT_LAYOUTS[value][0]
+
+    rows = scraper.parse_market_tables_html(render("6 Months", report_value=value), report=text)
+
+    assert rows == portal_rows("6 Months", report=text)
+
+
+def test_extra_columns_are_kept_under_their_header():
+    rows = scraper.parse_market_tables_html(render("3 Months", report_value="byValue"), report="Most Active by Value")
+
+    assert rows[0]["Last Trade"] == "10:45"
+    assert rows[0]["Value Traded"] == "12,960"
+    assert rows[0]["Open"] == ""
+
+
+@pytest.mark.parametrize("head", ["", "<tr><th>الشركة</th><th>الافتتاح</th></tr>",
+                                  "<tr><th>Company</th><th>Open</th></tr>"])
+def test_tables_without_usable_headers_keep_the_fixed_layout(head):
+    html = (f'<table id="marketPerformanceTable2"><thead>{head}</thead><tbody><tr><td><a href="/x/1234">ACME</a></td>'
+            "<td>10.00</td><td>11.00</td><td>9.50</td><td>10.80</td><td>0.80</td><td>8.00%</td>"
+            "<td>1,200</td><td>12,960</td></tr></tbody></table>")
+
+    rows = scraper.parse_market_tables_html(html)
+
+    assert rows == portal_rows("1 Year")
+
+
+def test_primary_report_ignores_its_headers():
+    head = "".join(f"<th>{h}</th>" for h in ["Company", "Open", "Highest", "Lowest", "Close", "Change", "Change%",
+                                            "Volume Traded", "Value Traded (SAR)"])
+    html = (f'<table id="marketPerformanceTable2"><thead><tr>{head}</tr></thead><tbody><tr>'
+            '<td><a href="/x/1234">ACME</a></td><td>10.00</td><td>11.00</td><td>9.50</td><td>10.80</td>'
+            "<td>0.80</td><td>8.00%</td><td>1,200</td><td>12,960</td></tr></tbody></table>")
+
+    rows = scraper.parse_market_tables_html(html)
+
+    assert rows == portal_rows("1 Year")
+    assert rows[0]["Change %"] == "8.00%"
+
+
+def test_extra_reports_are_fetched_by_exact_option_text(portal):
+    fetched = scraper.fetch_results_http(portal.url, scraper.PERIODS, report="most active by volume")
+
+    assert fetched == {p: portal_rows(p, report="Most Active by Volume") for p in scraper.PERIODS}
+    assert {post["reportList"] for post in portal.posts} == {"byVolume"}
+
+
+def test_unknown_reports_are_not_guessed(portal):
+    assert scraper.fetch_results_http(portal.url, scraper.PERIODS, report="Volume") is None
+    assert portal.posts == []
+
+
+def test_resolve_reports_keeps_names_and_maps_the_primary_value():
+    assert scraper.resolve_reports("gainersPercentage, Most Active  by Volume,,") == \
+        [scraper.REPORT_VALUE_TEXT, "Most Active by Volume"]
+
+
+def test_serial_retry_keeps_the_extra_reports(monkeypatch):
+    calls = []
+
+    def fake_session(periods, headless, lean, metrics, extra_reports, extra_out):
+        calls.append((list(periods), extra_reports))
+        if len(calls) == 1:
+            raise RuntimeError("worker crashed")
+        for report in extra_reports or []:
+            extra_out.setdefault(report, {}).update({p: [] for p in periods})
+        return {p: [] for p in periods}
+
+    monkeypatch.setattr(scraper, "_scrape_session", fake_session)
+    extra_out = {}
+
+    results = scraper.scrape_parallel(scraper.PERIODS, 2, extra_reports=["Most Active by Volume"],
+                                      extra_out=extra_out)
+
+    assert list(results) == scraper.PERIODS
+    assert set(extra_out["Most Active by Volume"]) == set(scraper.PERIODS)
+    assert all(extra == ["Most Active by Volume"] for _, extra in calls)
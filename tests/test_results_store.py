@@ -0,0 +1,48 @@
+import time
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+import results_store
+
+
+def _append(root, rows, day):
+    path = results_store.append(pd.DataFrame(rows), "rs_analysis", day, root=str(root))
+    time.sleep(0.001)  # distinct scraped_at per run
+    return path
+
+
+def test_latest_run_is_picked_before_the_filter(tmp_path):
+    _append(tmp_path, {"Symbol": ["1", "2"], "RS": [1.0, 2.5]}, "2026-01-02")
+    _append(tmp_path, {"Symbol": ["1"], "RS": [1.5]}, "2026-01-02")  # re-run without symbol 2
+    _append(tmp_path, {"Symbol": ["2"], "RS": [3.0]}, "2026-01-03")
+
+    df = results_store.read("rs_analysis", filter=ds.field("Symbol") == "2", root=str(tmp_path))
+
+    assert df["scrape_date"].tolist() == ["2026-01-03"]
+    assert df["RS"].tolist() == [3.0]
+
+
+def test_all_runs_are_kept_without_latest_only(tmp_path):
+    _append(tmp_path, {"Symbol": ["1"], "RS": [1.0]}, "2026-01-02")
+    _append(tmp_path, {"Symbol": ["1"], "RS": [1.5]}, "2026-01-02")
+
+    df = results_store.read("rs_analysis", latest_only=False, root=str(tmp_path))
+
+    assert sorted(df["RS"]) == [1.0, 1.5]
+
+
+def test_date_range_only_opens_its_partitions(tmp_path):
+    _append(tmp_path, {"Symbol": ["1"], "RS": [1.0]}, "2026-01-02")
+    _append(tmp_path, {"Symbol": ["1"], "RS": [2.0], "Stale": [True]}, "2026-01-05")
+    # a corrupt file outside the range would fail if its footer were read
+    bad = tmp_path / "rs_analysis" / "scrape_date=2025-12-01"
+    bad.mkdir()
+    (bad / "part-000000000000.parquet").write_bytes(b"PAR1 not a parquet file PAR1")
+
+    dset = results_store.open_dataset("rs_analysis", start="2026-01-01", root=str(tmp_path))
+    df = results_store.read("rs_analysis", start="2026-01-01", root=str(tmp_path))
+
+    assert len(dset.files) == 2
+    assert df["RS"].tolist() == [1.0, 2.0]
+    assert df["Stale"].isna().tolist() == [True, False]
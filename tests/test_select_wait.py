@@ -0,0 +1,46 @@
+import pytest
+
+import saudi_exchange_scraper as scraper
+
+
+@pytest.fixture
+def page(monkeypatch):
+    state = {"change": "changed", "allow_noop": [], "polled": []}
+    monkeypatch.setattr(scraper, "arm_table_watch", lambda driver: True)
+    monkeypatch.setattr(scraper, "_first_cell_text", lambda driver: "old first cell")
+
+    def observe(driver, allow_noop=False):
+        state["allow_noop"].append(allow_noop)
+        return state["change"]
+
+    monkeypatch.setattr(scraper, "wait_for_table_change", observe)
+
+    def poll(driver, wait, prev):
+        state["polled"].append(prev)
+        return True
+
+    monkeypatch.setattr(scraper, "wait_for_table_update", poll)
+    return state
+
+
+def test_failed_selection_raises_instead_of_waiting(page):
+    metrics = scraper.RunMetrics()
+
+    with pytest.raises(ValueError):
+        scraper.select_and_wait(None, None, lambda: scraper.SELECT_FAILED, metrics, "select_period", period="1 Year")
+
+    assert metrics.counters["select_failures"] == 1
+
+
+def test_polling_fallback_waits_for_the_previous_table(page):
+    page["change"] = None  # observer script failed
+
+    assert scraper.select_and_wait(None, None, lambda: scraper.SELECT_NATIVE)
+    assert page["polled"] == ["old first cell"]
+
+
+def test_only_native_picks_may_be_noops(page):
+    scraper.select_and_wait(None, None, lambda: scraper.SELECT_NATIVE)
+    scraper.select_and_wait(None, None, lambda: scraper.SELECT_COMBOBOX)
+
+    assert page["allow_noop"] == [True, False]
@@ -0,0 +1,110 @@
+"""
+Tadawul trading calendar with precomputed lookback indices.
+
+The calendar is the sorted set of distinct trading dates (usually
+``SELECT DISTINCT date FROM prices``). For every date it precomputes, once,
+the index of the calendar-month lookback (the last trading day on or before
+``date - N months``, same rule as ``relativedelta``) and of the N-trading-day
+lookback. The RS engines then use one array lookup per date shared by all
+symbols, instead of date arithmetic per symbol and date:
+
+    cal = TradingCalendar.from_db(conn)
+    k = cal.calendar_lookback(3)        # k[i]: index of the 3-month lookback of cal.dates[i]
+    j = cal.trading_lookback(63)        # j[i]: index 63 trading days before, -1 if none
+
+Weekends: Friday/Saturday since 29 June 2013, Thursday/Friday before that.
+Weekdays inside the covered range with no prices are treated as holidays.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# date.weekday(): Monday=0 ... Sunday=6
+WEEKEND_CHANGE = date(2013, 6, 29)
+WEEKEND_BEFORE = (3, 4)  # Thursday, Friday
+WEEKEND = (4, 5)         # Friday, Saturday
+
+DateLike = Union[str, date, pd.Timestamp]
+
+
+def is_weekend(day: date) -> bool:
+    return day.weekday() in (WEEKEND if day >= WEEKEND_CHANGE else WEEKEND_BEFORE)
+
+
+def _to_ordinals(dates) -> np.ndarray:
+    days = pd.to_datetime(pd.Series(dates)).values.astype("datetime64[D]").astype(np.int64)
+    return days + date(1970, 1, 1).toordinal()
+
+
+class TradingCalendar:
+    """Sorted trading days with cached per-date lookback indices (-1 = before the first day)."""
+
+    def __init__(self, dates: Iterable):
+        self.ordinals = np.unique(_to_ordinals(list(dates)))
+        self._calendar: Dict[int, np.ndarray] = {}
+        self._trading: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_ordinals(cls, ordinals) -> "TradingCalendar":
+        """Build from ``date.toordinal()`` values (any order, duplicates allowed)."""
+        cal = cls([])
+        cal.ordinals = np.unique(np.asarray(ordinals, dtype=np.int64))
+        return cal
+
+    @classmethod
+    def from_db(cls, conn, table: str = "prices") -> "TradingCalendar":
+        """Build the calendar from the distinct dates of ``table`` (psycopg2 connection)."""
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT DISTINCT date FROM {table} ORDER BY date")
+            return cls(row[0] for row in cur.fetchall())
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    @property
+    def dates(self) -> List[date]:
+        return [date.fromordinal(int(o)) for o in self.ordinals]
+
+    def index_of(self, dates) -> np.ndarray:
+        """Position of each date in the calendar (dates must be trading days)."""
+        return np.searchsorted(self.ordinals, _to_ordinals(dates))
+
+    def is_trading_day(self, day: DateLike) -> bool:
+        o = pd.Timestamp(day).toordinal()
+        i = np.searchsorted(self.ordinals, o)
+        return i < len(self.ordinals) and self.ordinals[i] == o
+
+    def holidays(self) -> List[date]:
+        """Weekdays between the first and last trading day that have no trading."""
+        if not len(self.ordinals):
+            return []
+        trading = set(self.ordinals.tolist())
+        first, last = int(self.ordinals[0]), int(self.ordinals[-1])
+        days = (date.fromordinal(o) for o in range(first, last + 1) if o not in trading)
+        return [d for d in days if not is_weekend(d)]
+
+    def calendar_lookback(self, months: int) -> np.ndarray:
+        """Index of the last trading day on or before ``date - months`` for every date."""
+        if months not in self._calendar:
+            past = np.fromiter(
+                ((date.fromordinal(int(o)) - relativedelta(months=months)).toordinal() for o in self.ordinals),
+                dtype=np.int64, count=len(self.ordinals)
+            )
+            self._calendar[months] = np.searchsorted(self.ordinals, past, side="right") - 1
+        return self._calendar[months]
+
+    def trading_lookback(self, days: int) -> np.ndarray:
+        """Index ``days`` trading days earlier for every date (-1 when out of range)."""
+        if days not in self._trading:
+            idx = np.arange(len(self.ordinals)) - days
+            self._trading[days] = np.where(idx >= 0, idx, -1)
+        return self._trading[days]
+
+    def lookback_ordinals(self, months: int) -> np.ndarray:
+        """Ordinal of the calendar lookback day for every date (0 when there is none)."""
+        k = self.calendar_lookback(months)
+        return np.where(k >= 0, self.ordinals[np.maximum(k, 0)], 0)